@@ -0,0 +1,36 @@
+"""
+Article feature table shared by the statistics
+
+The article table extended by the article flags the statistics are
+based on. Each flag is computed once as a typed column, so every
+statistic is a cheap aggregation (a boolean selection, a sum or a
+value count) over the feature table instead of a pass over the
+charting results of its own.
+"""
+import data_filters as filters
+from auxiliary_tables import load_auxiliary_table
+from instrumentation import traced
+
+# Feature columns appended to the article table
+FEATURE_COLUMNS = ["Data origin count", "Single data origin", "Domestic use", "Crossborder",
+                   "Same author origin", "ICD-10 chapter assigned", "Common data source"]
+
+@traced("statistics")
+def article_features(df, df_article_source, df_article_origin):
+    """
+    Computes all article flags in one pass and returns
+    the article table with the flags as additional columns
+    """
+    # Data sources listed in Data_source_information.xlsx
+    common_data_sources = load_auxiliary_table("Data_source_information")["Data source"].unique()
+
+    features = df.copy()
+    features["Data origin count"] = filters.data_origin_count(df, df_article_origin).astype("int16")
+    features["Single data origin"] = filters.single_data_origin(df, df_article_origin)
+    features["Domestic use"] = filters.domestic_use(df)
+    features["Crossborder"] = filters.crossborder_article(df, df_article_origin)
+    features["Same author origin"] = filters.same_author_origin(df)
+    features["ICD-10 chapter assigned"] = filters.assigned_icd_chapter(df)
+    features["Common data source"] = filters.uses_data_source(df, df_article_source, common_data_sources)
+
+    return features
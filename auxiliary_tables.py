@@ -0,0 +1,113 @@
+import hashlib
+import json
+import os
+import pandas as pd
+from instrumentation import traced
+
+CACHE_DIR = "auxiliary_data/.cache"
+
+# Auxiliary workbooks by name: (file, sheet, dtype used for reading)
+AUXILIARY_TABLES = {
+    "Country_information": ("auxiliary_data/Country_information.xlsx", "Country_information", None),
+    "Data_source_information": ("auxiliary_data/Data_source_information.xlsx", "Data_source_information", str),
+    "ICD-10_chapter_mapping": ("auxiliary_data/ICD-10_chapter_mapping.xlsx", "ICD-10_chapter_mapping", str),
+    "PubMed_number_paper_published": ("auxiliary_data/PubMed_number_paper_published.xlsx", "PubMed_number_paper_published", str),
+    "Citable_documents_per_country": ("auxiliary_data/Citable_documents_per_country.xlsx", "Citable_documents_per_country", None),
+}
+
+# Tables already loaded in this process: name -> (mtime of source file, table)
+_loaded_tables = {}
+
+@traced("auxiliary")
+def load_auxiliary_table(name, columns=None):
+    """
+    Returns an auxiliary table by name. Each workbook is
+    parsed at most once per process (and only reloaded if
+    the file changed on disk), later runs read it from the
+    columnar cache in CACHE_DIR
+    """
+    file, sheet, dtype = AUXILIARY_TABLES[name]
+    mtime = os.stat(file).st_mtime_ns
+
+    if name not in _loaded_tables or _loaded_tables[name][0] != mtime:
+        _loaded_tables[name] = (mtime, read_cached_workbook(name, file, sheet, dtype))
+
+    df = _loaded_tables[name][1]
+    if columns is not None:
+        df = df[columns]
+
+    # Hand out copies so callers cannot alter the shared table
+    return df.copy()
+
+def auxiliary_file(name):
+    """
+    Returns the path of an auxiliary workbook by name
+    """
+    return AUXILIARY_TABLES[name][0]
+
+def file_sha256(file):
+    """
+    Calculates the SHA-256 hash of a file's content
+    """
+    sha = hashlib.sha256()
+    with open(file, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+def clear_auxiliary_cache():
+    """
+    Drops all loaded tables and removes the on-disk cache
+    """
+    _loaded_tables.clear()
+    if os.path.isdir(CACHE_DIR):
+        for file in os.listdir(CACHE_DIR):
+            os.remove(os.path.join(CACHE_DIR, file))
+
+def parquet_available():
+    """
+    Checks if pyarrow is installed to read and write Parquet files
+    """
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def read_cached_workbook(name, file, sheet, dtype=None):
+    """
+    Reads a workbook sheet through the columnar cache in CACHE_DIR
+    (stored under name), the workbook is only parsed if its content
+    changed since it was cached
+    """
+
+    # Without pyarrow there is no columnar cache, read the workbook directly
+    if not parquet_available():
+        return pd.read_excel(file, sheet_name=sheet, skiprows=0, dtype=dtype)
+
+    cache_file = os.path.join(CACHE_DIR, f"{name}.parquet")
+    meta_file = os.path.join(CACHE_DIR, f"{name}.json")
+    stat = os.stat(file)
+
+    meta = None
+    if os.path.exists(cache_file) and os.path.exists(meta_file):
+        with open(meta_file) as f:
+            meta = json.load(f)
+
+    # Unchanged modification time and size: trust the cache
+    if meta is not None and meta["mtime_ns"] == stat.st_mtime_ns and meta["size"] == stat.st_size:
+        return pd.read_parquet(cache_file)
+
+    # File was touched, only re-parse it if the content changed as well
+    sha256 = file_sha256(file)
+    if meta is not None and meta["sha256"] == sha256:
+        df = pd.read_parquet(cache_file)
+    else:
+        df = pd.read_excel(file, sheet_name=sheet, skiprows=0, dtype=dtype)
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        df.to_parquet(cache_file, index=False)
+
+    with open(meta_file, "w") as f:
+        json.dump({"file": file, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": sha256}, f, indent=2)
+
+    return df
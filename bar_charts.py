@@ -0,0 +1,108 @@
+"""
+Bar chart toolkit shared by the bar chart figures
+
+Every bar series is drawn as a single PolyCollection with an array of
+face colors instead of one Rectangle per bar, value labels of a series
+are placed by one call sharing one FontProperties object, and the
+break marks of a broken axis are one LineCollection per axes. The
+number of artists per figure therefore does not grow with the number
+of countries, data sources or years. matplotlib has no artist drawing
+several strings, so labels remain one Text each (which keeps them as
+text in the SVG export).
+"""
+import matplotlib as mpl
+import matplotlib.pyplot as plt
+import numpy as np
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.font_manager import FontProperties
+from matplotlib.patches import Patch
+
+COLOR = 'black'
+
+def apply_style():
+    """
+    Uniform figure styling (ggplot with black text)
+    """
+    mpl.style.use("ggplot")
+    mpl.rcParams['text.color'] = COLOR
+    mpl.rcParams['axes.labelcolor'] = COLOR
+    mpl.rcParams['xtick.color'] = COLOR
+    mpl.rcParams['ytick.color'] = COLOR
+
+def bars(ax, x, heights, colors, width=0.4, bottom=0, horizontal=False, edgecolor="black", linewidth=1, label=None):
+    """
+    Draws a bar series as one collection, colors is a
+    single color or one color per bar. Horizontal bars are
+    placed at y = x with length heights
+    """
+    x = np.asarray(x, dtype=float)
+    heights = np.asarray(heights, dtype=float)
+    bottom = np.broadcast_to(np.asarray(bottom, dtype=float), x.shape)
+
+    # Corners of all bars as array (bars, 4, 2)
+    left, right = x - width / 2, x + width / 2
+    low, high = bottom, bottom + heights
+    vertices = np.stack([np.stack([left, right, right, left], axis=1), np.stack([low, low, high, high], axis=1)], axis=2)
+    if horizontal:
+        vertices = vertices[:, :, ::-1]
+
+    # Colors of a Series are passed as list
+    if hasattr(colors, "to_numpy"):
+        colors = list(colors)
+    collection = PolyCollection(vertices, facecolors=colors, edgecolors=edgecolor, linewidths=linewidth, label=label)
+    ax.add_collection(collection)
+
+    # Bars start at the axis like ax.bar() (no margin below the base line)
+    if horizontal:
+        collection.sticky_edges.x.append(0)
+    else:
+        collection.sticky_edges.y.append(0)
+    ax.autoscale_view()
+    return collection
+
+def bar_labels(ax, x, y, labels, fontsize=10, ha='center', va='bottom', **kwargs):
+    """
+    Places one label per bar at (x, y), empty labels are skipped
+    """
+    font = FontProperties(size=fontsize)
+    return [ax.text(posx, posy, label, ha=ha, va=va, fontproperties=font, **kwargs)
+            for posx, posy, label in zip(x, y, labels) if label != '']
+
+def legend_patches(colors):
+    """
+    Legend handles for a dict label -> color
+    """
+    return [Patch(facecolor=color, label=label, edgecolor="black", linewidth=1) for label, color in colors.items()]
+
+def break_marks(ax, x, y, width=0.2, height=0.003):
+    """
+    Draws diagonal break marks centered at (x, y) as one collection
+    """
+    x, y = np.asarray(x, dtype=float), np.broadcast_to(np.asarray(y, dtype=float), np.shape(x))
+    segments = np.stack([np.stack([x - width / 2, y - height / 2], axis=1), np.stack([x + width / 2, y + height / 2], axis=1)], axis=1)
+    ax.add_collection(LineCollection(segments, colors='k', clip_on=False))
+
+def broken_axis_bars(x, heights, colors, break_lower, start_upper, y_lim, figsize, width=0.4, break_width=0.2, break_height=0.003, hspace=0.1):
+    """
+    Bar chart with a broken y axis: the lower axes shows 0 to
+    break_lower, the upper one start_upper to y_lim. Bars are drawn
+    in both axes, bars above break_lower get break marks. Returns
+    the figure and the upper and lower axes
+    """
+    fig, (ax1, ax2) = plt.subplots(2, 1, sharex=True, figsize=figsize, gridspec_kw={'height_ratios': [y_lim - start_upper, break_lower], 'hspace': hspace})
+    bars(ax1, x, heights, colors, width)
+    bars(ax2, x, heights, colors, width)
+
+    # Break marks on the bars crossing the break
+    broken = np.asarray(x)[np.asarray(heights) > break_lower]
+    break_marks(ax1, broken, start_upper, break_width, break_height)
+    break_marks(ax2, broken, break_lower, break_width, break_height)
+
+    # Set y-axis limits and hide the spines between the axes
+    ax1.set_ylim(start_upper, y_lim)
+    ax2.set_ylim(0, break_lower)
+    ax1.spines['bottom'].set_visible(False)
+    ax2.spines['top'].set_visible(False)
+    ax1.tick_params(axis='x', which='both', bottom=False)
+
+    return fig, ax1, ax2
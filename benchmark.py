@@ -0,0 +1,141 @@
+"""
+Benchmark of the preprocessing and the statistics
+
+Runs every preprocessing and statistics stage on synthetic charting
+results (see synthetic_charting.py) at several scales and records the
+wall time and the peak memory of each stage. Peak memory is measured
+with tracemalloc in a second run of the stage, so the recorded wall
+time is not distorted by tracing. Results are written as JSON and can
+be compared to an earlier run to spot scaling regressions.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import time
+import tracemalloc
+from tabulate import tabulate
+import data_filters as filters
+from synthetic_charting import SCALES, SYNTHETIC_DIR, write_charting
+
+BENCHMARK_FILE = os.path.join(SYNTHETIC_DIR, "benchmark_results.json")
+
+# Stages slower or using more memory than this factor times the compared run are flagged
+REGRESSION_FACTOR = 1.5
+
+def benchmark_stages():
+    """
+    Benchmarked stages as (name, function), every function gets the
+    state of the previous stages and returns new state (or None)
+    """
+    import data_preprocessing as pre
+    import data_statistics as stats
+    from article_features import article_features
+    from auxiliary_tables import load_auxiliary_table
+    from charting_aggregates import aggregate_charting, stream_charting_aggregates
+    from data_loading import load_and_preprocess_charting
+    from threshold_sweep import sweep_all
+
+    def load(state):
+        return dict(zip(["df", "df_article_source", "df_article_origin"], load_and_preprocess_charting(state["chart_file"])))
+
+    return [
+        ("load_charting", load),
+        ("stream_charting", lambda state: {"streamed": stream_charting_aggregates(state["chart_file"])}),
+        ("preprocess_figure_1", lambda state: {"df_figure_1": pre.preprocess_figure_1(state["df"])}),
+        ("preprocess_figure_2", lambda state: {"df_figure_2": pre.preprocess_figure_2(state["df"], state["df_article_origin"])}),
+        ("preprocess_figure_3", lambda state: pre.preprocess_figure_3(state["df"], state["df_article_origin"])),
+        ("preprocess_figure_S2", lambda state: pre.preprocess_figure_S2(state["df"])),
+        ("preprocess_figure_4", lambda state: pre.preprocess_figure_4(state["df_article_source"])),
+        ("preprocess_figure_5", lambda state: pre.preprocess_figure_5(state["df"], state["df_article_source"])),
+        ("aggregate_charting", lambda state: {"aggregates": aggregate_charting(state["df"], state["df_article_source"], state["df_article_origin"])}),
+        ("threshold_sweep", lambda state: sweep_all(state["aggregates"])),
+        ("article_features", lambda state: {"features": article_features(state["df"], state["df_article_source"], state["df_article_origin"])}),
+        ("additional_statistics_figure_1", lambda state: stats.additional_statistics_figure_1(state["df_figure_1"])),
+        ("calculate_EU_contribution", lambda state: stats.calculate_EU_contribution(state["features"])),
+        ("additional_statistics_figure_2", lambda state: stats.additional_statistics_figure_2(state["df_figure_2"])),
+        ("calculate_first_and_senior_author_overlap", lambda state: stats.calculate_first_and_senior_author_overlap(state["features"])),
+        ("author_and_data_origin", lambda state: stats.author_and_data_origin(state["features"], state["df_article_origin"])),
+        ("authors_per_income_group", lambda state: stats.authors_per_income_group(state["features"], load_auxiliary_table("Country_information"), load_auxiliary_table("Citable_documents_per_country"))),
+        ("crossborder_and_domestic_use", lambda state: stats.crossborder_and_domestic_use(state["features"])),
+        ("cross_border_flows", lambda state: stats.cross_border_flows(state["features"], state["df_article_origin"])),
+        ("custodian_usage", lambda state: stats.custodian_usage(state["features"])),
+        ("articles_assigned_to_icd", lambda state: stats.articles_assigned_to_icd(state["features"])),
+        ("source_usage_for_specific_disease", lambda state: stats.source_usage_for_specific_disease(state["features"], state["df_article_source"], "2", "Flatiron Health")),
+    ]
+
+def run_benchmark(scales=SCALES, memory=True, seed=0):
+    """
+    Benchmarks all stages for every scale and returns
+    one record per scale and stage
+    """
+    records = []
+    for scale in scales:
+        state = {"chart_file": write_charting(scale, seed)}
+        for name, stage in benchmark_stages():
+            seconds, result = _measure_time(stage, state)
+            peak = _measure_memory(stage, state) if memory else None
+            if isinstance(result, dict):
+                state.update(result)
+
+            records.append({"scale": scale, "stage": name, "seconds": seconds,
+                            "peak_mib": None if peak is None else peak / 2 ** 20})
+            print("x%-5d %-42s %9.3fs %s" % (scale, name, seconds, "" if peak is None else "%9.1f MiB" % (peak / 2 ** 20)))
+
+    return records
+
+def compare_benchmarks(records, previous, factor=REGRESSION_FACTOR):
+    """
+    Ratios of time and memory to a previous run per scale and
+    stage, stages exceeding factor are flagged as regressions
+    """
+    previous = {(record["scale"], record["stage"]): record for record in previous}
+    rows = []
+    for record in records:
+        before = previous.get((record["scale"], record["stage"]))
+        if before is None:
+            continue
+        time_ratio = record["seconds"] / before["seconds"] if before["seconds"] else None
+        memory_ratio = record["peak_mib"] / before["peak_mib"] if record["peak_mib"] and before["peak_mib"] else None
+        regression = any(ratio is not None and ratio > factor for ratio in [time_ratio, memory_ratio])
+        rows.append({"Scale": record["scale"], "Stage": record["stage"], "Time ratio": time_ratio,
+                     "Memory ratio": memory_ratio, "Regression": "yes" if regression else ""})
+    return rows
+
+def _measure_time(stage, state):
+    filters.clear_mask_cache()
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        result = stage(state)
+        return time.perf_counter() - start, result
+
+def _measure_memory(stage, state):
+    filters.clear_mask_cache()
+    tracemalloc.start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            stage(state)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark preprocessing and statistics on synthetic charting results")
+    parser.add_argument("scales", nargs="*", type=int, default=SCALES, help="multiples of the size of the charting results")
+    parser.add_argument("--no-memory", action="store_true", help="skip measuring the peak memory")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the synthetic charting results")
+    parser.add_argument("--output", default=BENCHMARK_FILE, help="file to write the results to")
+    parser.add_argument("--compare", help="results of an earlier run to compare with")
+    args = parser.parse_args()
+
+    records = run_benchmark(args.scales, memory=not args.no_memory, seed=args.seed)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(records, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            rows = compare_benchmarks(records, json.load(f))
+        print(tabulate(rows, headers='keys', tablefmt='psql', floatfmt=".2f"))
@@ -0,0 +1,85 @@
+"""
+Vectorized bootstrap confidence intervals
+
+Resamples are drawn as NumPy index matrices (one row per resample)
+and the statistic is evaluated for a whole batch of resamples at
+once. Every batch draws from its own random stream spawned from the
+seed, so the result only depends on the seed and the batch size and
+not on whether (or how many) worker processes are used.
+"""
+import functools
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+N_RESAMPLES = 10000
+BATCH_SIZE = 1000
+
+# Upper bound of the number of elements of one index matrix, large
+# samples are resampled in smaller batches to bound the memory
+MAX_BATCH_ELEMENTS = 10 ** 7
+
+def bootstrap(data, statistic, n_resamples=N_RESAMPLES, seed=0, workers=None, batch_size=BATCH_SIZE):
+    """
+    Returns the statistic for n_resamples resamples (with replacement)
+    of the rows of data. statistic is called with an array of shape
+    (resamples, rows, ...) and returns one value per resample, it has
+    to be a module-level function (or a partial of one) if workers
+    processes are used. Batches hold at most MAX_BATCH_ELEMENTS
+    resampled rows in total
+    """
+    data = np.asarray(data)
+    batch_size = max(1, min(batch_size, MAX_BATCH_ELEMENTS // max(1, len(data))))
+    sizes = [min(batch_size, n_resamples - start) for start in range(0, n_resamples, batch_size)]
+    streams = np.random.SeedSequence(seed).spawn(len(sizes))
+    run_batch = functools.partial(_bootstrap_batch, data, statistic)
+
+    if workers is None or workers <= 1:
+        results = list(map(run_batch, sizes, streams))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(run_batch, sizes, streams))
+
+    return np.concatenate(results)
+
+def confidence_interval(estimates, confidence=0.95):
+    """
+    Percentile interval of the bootstrap estimates (resamples
+    for which the statistic is undefined are ignored)
+    """
+    alpha = (1 - confidence) / 2
+    return tuple(np.nanquantile(estimates, [alpha, 1 - alpha]))
+
+def _bootstrap_batch(data, statistic, size, stream):
+    rng = np.random.default_rng(stream)
+    indices = rng.integers(0, len(data), size=(size, len(data)))
+    return statistic(data[indices])
+
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Batched statistics
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+def mean(samples):
+    """
+    Mean per resample
+    """
+    return samples.mean(axis=1)
+
+def share(samples):
+    """
+    Percentage of True values per resample
+    """
+    return samples.mean(axis=1) * 100
+
+def slope(samples):
+    """
+    Least-squares slope per resample of (x, y) pairs, NaN
+    for resamples drawing a single x value only
+    """
+    x, y = samples[..., 0], samples[..., 1]
+    x = x - x.mean(axis=1, keepdims=True)
+    y = y - y.mean(axis=1, keepdims=True)
+    variance = (x * x).sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(variance > 0, (x * y).sum(axis=1) / variance, np.nan)
@@ -0,0 +1,120 @@
+"""
+Per-figure aggregates of the charting results
+
+The aggregates are counts that can be computed per chunk of the
+charting export and summed up afterwards. Counts are kept in order
+of first appearance, so sorting the combined counts yields the same
+order (including ties) as value_counts() on the full table.
+Categorical columns are counted over the observed values only.
+"""
+import pandas as pd
+import data_filters as filters
+from data_loading import CHARTING_FILE, iter_charting_chunks
+from instrumentation import traced
+
+def count_values(values, sort=True):
+    """
+    value_counts() of a column, also for categorical columns,
+    whose value_counts() lists unobserved categories with a count
+    of 0 in category order. The codes of the categories are counted
+    instead, which yields the same order as counting the strings
+    """
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        return values.value_counts(sort=sort)
+
+    codes = pd.Series(values.cat.codes, name=values.name)
+    counts = codes[codes >= 0].value_counts(sort=sort)
+    counts.index = pd.Index(values.cat.categories.take(counts.index), name=values.name)
+    return counts
+
+def count_year_covid(df):
+    """
+    Number of articles per publishing year and COVID-19 research status
+    """
+    return df.groupby(['Publishing year', 'COVID-19 research']).size()
+
+def count_domestic_origin(df, df_article_origin):
+    """
+    Number of articles per data origin for articles with a
+    single data origin that equals the first author's country
+    """
+    df = df[filters.single_data_origin(df, df_article_origin) & filters.domestic_use(df)]
+    return count_values(df['Data origin'], sort=False)
+
+def flow_rows(df, df_article_origin):
+    """
+    Data flows, i.e. the specific data origins of each
+    article joined with the article's first author
+    """
+    df_flows = pd.merge(df_article_origin, df[['PMID', 'First author']], on='PMID')
+    return df_flows[filters.specific_data_origin(df_flows)]
+
+def count_flows(df_flows):
+    """
+    Number of data flows per first author and data origin
+    """
+    return df_flows.groupby(['First author', 'Data origin'], sort=False, observed=True).size()
+
+def count_icd(df):
+    """
+    Number of articles per assigned ICD-10 chapter
+    """
+    return count_values(df.loc[filters.assigned_icd_chapter(df), 'ICD-10 chapter'], sort=False)
+
+def count_sources(df_article_source):
+    """
+    Number of articles per specific data source
+    """
+    return count_values(df_article_source.loc[filters.specific_data_source(df_article_source), 'Data source'], sort=False)
+
+def source_icd_rows(df, df_article_source):
+    """
+    Data sources of each article joined with
+    the article's ICD-10 chapter
+    """
+    return pd.merge(df_article_source, df[['PMID', 'ICD-10 chapter']], on='PMID')
+
+def count_source_icd(df, df_article_source):
+    """
+    Number of articles per specific data source and ICD-10
+    chapter (including articles not assigned to a chapter)
+    """
+    df = source_icd_rows(df, df_article_source)
+    df = df[filters.specific_data_source(df)]
+    return df.groupby(['Data source', 'ICD-10 chapter'], sort=False, observed=True).size()
+
+def aggregate_charting(df, df_article_source, df_article_origin):
+    """
+    Computes all per-figure aggregates of (a chunk of) the charting results
+    """
+    return {
+        "year_covid": count_year_covid(df),
+        "domestic_origin": count_domestic_origin(df, df_article_origin),
+        "flows": count_flows(flow_rows(df, df_article_origin)),
+        "icd": count_icd(df),
+        "sources": count_sources(df_article_source),
+        "source_icd": count_source_icd(df, df_article_source),
+    }
+
+def combine_aggregates(aggregates, other):
+    """
+    Sums two sets of aggregates, keeping keys in order of first appearance
+    """
+    combined = {}
+    for name, counts in aggregates.items():
+        levels = list(range(counts.index.nlevels))
+        combined[name] = pd.concat([counts, other[name]]).groupby(level=levels, sort=False).sum()
+        combined[name].index.names = counts.index.names
+    return combined
+
+@traced("load")
+def stream_charting_aggregates(chart_file=CHARTING_FILE, chunksize=100000):
+    """
+    Computes the per-figure aggregates of the charting results
+    chunk by chunk, so peak memory is bounded by the chunk size
+    """
+    aggregates = None
+    for df, df_article_source, df_article_origin in iter_charting_chunks(chart_file, chunksize):
+        chunk_aggregates = aggregate_charting(df, df_article_source, df_article_origin)
+        aggregates = chunk_aggregates if aggregates is None else combine_aggregates(aggregates, chunk_aggregates)
+    return aggregates
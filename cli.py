@@ -0,0 +1,151 @@
+"""
+Command line entry point for preprocessing, statistics and plots
+
+    python cli.py preprocess [--force] [--chunksize N]
+    python cli.py stats [NAME ...]
+    python cli.py sheet NAME
+    python cli.py plot [FIGURE ...] [--workers N]
+    python cli.py publish [--remove]
+    python cli.py serve [--host HOST] [--port PORT]
+
+Only the standard library is imported at startup. pandas, statsmodels,
+matplotlib, seaborn and tabulate are imported by the
+subcommand that needs them, so e.g. printing one statistic does not
+pay for the plotting libraries. With --import-times the time spent
+importing each module on demand is reported.
+"""
+import argparse
+import importlib
+import sys
+import time
+
+# Statistics by name: function of data_statistics, called on the shared data session
+STATISTICS = {
+    "figure_1": "additional_statistics_figure_1",
+    "eu_contribution": "calculate_EU_contribution",
+    "figure_2": "additional_statistics_figure_2",
+    "author_overlap": "calculate_first_and_senior_author_overlap",
+    "author_and_data_origin": "author_and_data_origin",
+    "income_groups": "authors_per_income_group",
+    "crossborder_and_domestic_use": "crossborder_and_domestic_use",
+    "crossborder_flows": "cross_border_flows",
+    "custodian_usage": "custodian_usage",
+    "icd_assigned": "articles_assigned_to_icd",
+}
+
+# Libraries reported by --import-times if they have been loaded
+HEAVY_MODULES = ["pandas", "scipy", "statsmodels", "matplotlib", "seaborn", "tabulate", "openpyxl", "pyarrow"]
+
+# Seconds spent in lazy_import() per module
+_import_times = {}
+
+def lazy_import(name):
+    """
+    Imports a module on first use and records the import time
+    """
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_times.setdefault(name, time.perf_counter() - start)
+    return module
+
+def preprocess(args):
+    pre = lazy_import("data_preprocessing")
+    pipeline = lazy_import("pipeline")
+    stages = pre.STAGES if args.chunksize is None else pre.preprocessing_stages(args.chunksize)
+    pipeline.run_pipeline(stages, force=args.force)
+
+def stats(args):
+    unknown = [name for name in args.names if name not in STATISTICS]
+    if unknown:
+        raise SystemExit("Unknown statistics: %s (available: %s)" % (", ".join(unknown), ", ".join(STATISTICS)))
+
+    data_statistics = lazy_import("data_statistics")
+    session = lazy_import("data_session").get_session()
+    if args.shared:
+        session.shared_dir = args.shared
+    if not args.names:
+        data_statistics.statistics_report(session)
+    for name in args.names:
+        session.run(getattr(data_statistics, STATISTICS[name]))
+
+def sheet(args):
+    df = lazy_import("data_session").get_session().figure_frame(args.name)
+    print(df.to_csv(index=False) if args.csv else df.to_string(index=False))
+
+def plot(args):
+    render_figures = lazy_import("render_figures")
+    start = time.perf_counter()
+    for name, (seconds, rendered) in render_figures.render_figures(args.figures, args.workers, args.shared).items():
+        print("%s: %.2fs%s" % (name, seconds, "" if rendered else " (up to date)"))
+    print("Total: %.2fs" % (time.perf_counter() - start))
+
+def publish(args):
+    shared_tables = lazy_import("shared_tables")
+    directory = args.directory or shared_tables.SHARED_DIR
+    if args.remove:
+        shared_tables.unpublish(directory)
+        return
+    for file in shared_tables.publish_session(lazy_import("data_session").get_session(), directory=directory):
+        print("Published %s" % file)
+
+def serve(args):
+    lazy_import("query_service").serve(args.host, args.port)
+
+def report_import_times(startup_seconds):
+    """
+    Prints the startup time of the entry point, the time of every
+    lazy import and which of the heavy libraries were loaded
+    """
+    print("Startup: %.3fs" % startup_seconds, file=sys.stderr)
+    for name, seconds in _import_times.items():
+        print("Import %s: %.3fs" % (name, seconds), file=sys.stderr)
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print("Loaded libraries: %s" % (", ".join(loaded) or "none"), file=sys.stderr)
+
+def main(argv=None):
+    start = time.perf_counter()
+    parser = argparse.ArgumentParser(description="Preprocessing, statistics and plots of the anonymization review")
+    parser.add_argument("--import-times", action="store_true", help="report the time spent importing modules")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    parser_preprocess = subparsers.add_parser("preprocess", help="write the figure data (only changed stages are recomputed)")
+    parser_preprocess.add_argument("--force", action="store_true", help="recompute all stages")
+    parser_preprocess.add_argument("--chunksize", type=int, default=None, help="stream the charting results in chunks of rows")
+    parser_preprocess.set_defaults(run=preprocess)
+
+    parser_stats = subparsers.add_parser("stats", help="print statistics (default: all)")
+    parser_stats.add_argument("names", nargs="*", help="statistics to print (available: %s)" % ", ".join(STATISTICS))
+    parser_stats.add_argument("--shared", metavar="DIR", help="attach to the tables published in DIR")
+    parser_stats.set_defaults(run=stats)
+
+    parser_sheet = subparsers.add_parser("sheet", help="print a figure sheet")
+    parser_sheet.add_argument("name", help="sheet name, e.g. data_figure_1")
+    parser_sheet.add_argument("--csv", action="store_true", help="print as CSV")
+    parser_sheet.set_defaults(run=sheet)
+
+    parser_plot = subparsers.add_parser("plot", help="render figures to figure_output/")
+    parser_plot.add_argument("figures", nargs="*", help="figures to render (default: all)")
+    parser_plot.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser_plot.add_argument("--shared", metavar="DIR", help="attach to the figure frames published in DIR")
+    parser_plot.set_defaults(run=plot)
+
+    parser_publish = subparsers.add_parser("publish", help="publish the tables as memory-mapped Arrow files for worker processes")
+    parser_publish.add_argument("--directory", default=None, help="directory of the tables (default: shared memory)")
+    parser_publish.add_argument("--remove", action="store_true", help="remove the published tables")
+    parser_publish.set_defaults(run=publish)
+
+    parser_serve = subparsers.add_parser("serve", help="serve figure data and statistics as JSON over HTTP")
+    parser_serve.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser_serve.add_argument("--port", type=int, default=8050, help="port to listen on")
+    parser_serve.set_defaults(run=serve)
+
+    args = parser.parse_args(argv)
+    startup_seconds = time.perf_counter() - start
+    try:
+        args.run(args)
+    finally:
+        if args.import_times:
+            report_import_times(startup_seconds)
+
+if __name__ == "__main__":
+    main()
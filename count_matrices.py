@@ -0,0 +1,177 @@
+"""
+Sparse count matrices of the charting results
+
+A CountMatrix holds the number of co-occurrences of two article
+attributes, e.g. the data flows from the first author's country
+(rows) to the data origin (columns), as a scipy sparse matrix built
+in one vectorized pass. Rows and columns are labelled by the sorted
+observed values, so aggregations over the matrix list values in the
+same order as groupby on the strings would.
+"""
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+class CountMatrix:
+    """
+    Sparse matrix of counts per pair of row and column labels
+    """
+    def __init__(self, counts, rows, columns, row_name, column_name):
+        self.counts = sparse.csr_matrix(counts)
+        self.rows = pd.Index(rows, name=row_name)
+        self.columns = pd.Index(columns, name=column_name)
+
+    @classmethod
+    def from_pairs(cls, row_values, column_values, rows=None, columns=None):
+        """
+        Counts the pairs of row_values and column_values (labels
+        default to the sorted observed values)
+        """
+        rows = _labels(row_values) if rows is None else pd.Index(rows)
+        columns = _labels(column_values) if columns is None else pd.Index(columns)
+        row_codes = rows.get_indexer(np.asarray(row_values, dtype=object))
+        column_codes = columns.get_indexer(np.asarray(column_values, dtype=object))
+
+        # Pairs with a value missing from the labels are not counted
+        known = (row_codes >= 0) & (column_codes >= 0)
+        counts = sparse.coo_matrix((np.ones(known.sum(), dtype=np.int64), (row_codes[known], column_codes[known])),
+                                   shape=(len(rows), len(columns)))
+        return cls(counts, rows, columns, row_values.name, column_values.name)
+
+    @classmethod
+    def from_counts(cls, counts, rows=None, columns=None):
+        """
+        Builds the matrix from a Series of counts indexed by
+        (row label, column label) pairs
+        """
+        row_values = counts.index.get_level_values(0)
+        column_values = counts.index.get_level_values(1)
+        rows = _labels(row_values) if rows is None else pd.Index(rows)
+        columns = _labels(column_values) if columns is None else pd.Index(columns)
+        matrix = sparse.coo_matrix((counts.to_numpy(dtype=np.int64), (rows.get_indexer(row_values), columns.get_indexer(column_values))),
+                                   shape=(len(rows), len(columns)))
+        return cls(matrix, rows, columns, counts.index.names[0], counts.index.names[1])
+
+    def off_diagonal(self):
+        """
+        Counts of pairs with different row and column label
+        (the matrix has to use the same labels for both)
+        """
+        return CountMatrix(self.counts - _diagonal_matrix(self.counts), self.rows, self.columns, self.rows.name, self.columns.name)
+
+    def diagonal(self):
+        """
+        Counts of pairs with the same row and column label
+        (the matrix has to use the same labels for both)
+        """
+        return CountMatrix(_diagonal_matrix(self.counts), self.rows, self.columns, self.rows.name, self.columns.name)
+
+    def row_counts(self):
+        """
+        Total count per row label (labels with a count of 0 are left out)
+        """
+        return _nonzero(pd.Series(np.asarray(self.counts.sum(axis=1)).ravel(), index=self.rows))
+
+    def column_counts(self):
+        """
+        Total count per column label (labels with a count of 0 are left out)
+        """
+        return _nonzero(pd.Series(np.asarray(self.counts.sum(axis=0)).ravel(), index=self.columns))
+
+    def filter_rows(self, min_count):
+        """
+        Matrix of the rows with a total count of at least min_count
+        """
+        keep = np.asarray(self.counts.sum(axis=1)).ravel() >= min_count
+        return CountMatrix(self.counts[keep], self.rows[keep], self.columns, self.rows.name, self.columns.name)
+
+    def drop_columns(self, labels):
+        """
+        Matrix without the given column labels
+        """
+        keep = ~self.columns.isin(labels)
+        return CountMatrix(self.counts[:, keep], self.rows, self.columns[keep], self.rows.name, self.columns.name)
+
+    def common_columns(self, min_count):
+        """
+        Column labels with a total count of at least min_count
+        """
+        return self.columns[np.asarray(self.counts.sum(axis=0)).ravel() >= min_count]
+
+    def collapse_columns(self, min_count, other="other"):
+        """
+        Matrix with all columns with a total count below
+        min_count summed up into a single column other
+        """
+        keep = self.columns.isin(self.common_columns(min_count))
+        counts = sparse.hstack([self.counts[:, keep], sparse.csr_matrix(self.counts[:, ~keep].sum(axis=1))])
+        return CountMatrix(counts, self.rows, self.columns[keep].append(pd.Index([other])), self.rows.name, self.columns.name)
+
+    def pair_counts(self, row_values, column_values):
+        """
+        Count of the pair for each given pair of values (0 for
+        values missing from the labels)
+        """
+        row_codes = self.rows.get_indexer(np.asarray(row_values, dtype=object))
+        column_codes = self.columns.get_indexer(np.asarray(column_values, dtype=object))
+        known = (row_codes >= 0) & (column_codes >= 0)
+        result = np.zeros(len(row_codes), dtype=np.int64)
+        result[known] = np.asarray(self.counts[row_codes[known], column_codes[known]]).ravel()
+        return pd.Series(result, index=row_values.index if isinstance(row_values, pd.Series) else None)
+
+    def pairs(self, min_count=1):
+        """
+        Counts of all pairs occurring at least min_count
+        times, indexed by (row label, column label)
+        """
+        counts = self.counts.tocoo()
+        keep = counts.data >= min_count
+        index = pd.MultiIndex.from_arrays([self.rows[counts.row[keep]], self.columns[counts.col[keep]]], names=[self.rows.name, self.columns.name])
+        return pd.Series(counts.data[keep], index=index)
+
+    def expand(self):
+        """
+        Frame with one row per counted pair of labels
+        """
+        pairs = self.pairs()
+        return pairs.index.repeat(pairs.values).to_frame(index=False)
+
+    def total(self):
+        """
+        Sum of all counts
+        """
+        return int(self.counts.sum())
+
+def flow_matrix(df_flows):
+    """
+    First author x data origin matrix of the number of data flows
+    (see charting_aggregates.flow_rows), both indexed by the
+    countries, so the diagonal holds the domestic flows
+    """
+    countries = _labels(df_flows['First author']).union(_labels(df_flows['Data origin']))
+    return CountMatrix.from_pairs(df_flows['First author'], df_flows['Data origin'], countries, countries)
+
+def flow_matrix_from_counts(flows):
+    """
+    Flow matrix from the number of data flows per first
+    author and data origin (see charting_aggregates.count_flows)
+    """
+    countries = _labels(flows.index.get_level_values('First author')).union(_labels(flows.index.get_level_values('Data origin')))
+    return CountMatrix.from_counts(flows, countries, countries)
+
+def source_icd_matrix(df_source_icd):
+    """
+    Data source x ICD-10 chapter matrix of the number of articles
+    (see charting_aggregates.source_icd_rows)
+    """
+    return CountMatrix.from_pairs(df_source_icd['Data source'], df_source_icd['ICD-10 chapter'])
+
+def _labels(values):
+    return pd.Index(np.sort(pd.unique(np.asarray(values, dtype=object))))
+
+def _diagonal_matrix(counts):
+    positions = np.arange(min(counts.shape))
+    return sparse.coo_matrix((counts.diagonal(), (positions, positions)), shape=counts.shape)
+
+def _nonzero(counts):
+    return counts[counts > 0]
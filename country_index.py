@@ -0,0 +1,112 @@
+"""
+Country dimension index
+
+Maps the country codes of Country_information.xlsx to integer ids and
+keeps every country attribute (name, region, income group, ...) as an
+array indexed by id. Looking up an attribute for a column of country
+codes is a single take on the ids (for categorical columns the ids are
+only computed for the categories), instead of a merge with the country
+table. Each attribute array ends with a missing value that unknown
+codes (id -1) take. Unknown codes are reported with an
+UnknownCountryWarning, empty codes count as missing, not unknown.
+"""
+import os
+import warnings
+import numpy as np
+import pandas as pd
+from auxiliary_tables import auxiliary_file, load_auxiliary_table
+
+class UnknownCountryWarning(UserWarning):
+    pass
+
+class CountryIndex:
+    """
+    Country codes -> integer ids with array-backed attributes
+    """
+    def __init__(self, df_countries, code_column="Country"):
+        self.code_column = code_column
+        self.codes = pd.Index(df_countries[code_column])
+        if not self.codes.is_unique:
+            raise ValueError("Country codes are not unique: %s" % ", ".join(self.codes[self.codes.duplicated()]))
+
+        # Attribute arrays with a trailing missing value taken by id -1
+        self.attributes = {}
+        for column in df_countries.columns.drop(code_column):
+            values = df_countries[column].to_numpy()
+            values = values.astype(float) if values.dtype.kind in "iub" else values
+            self.attributes[column] = np.append(values, np.array([np.nan], dtype=values.dtype))
+
+    def __len__(self):
+        return len(self.codes)
+
+    def ids(self, codes, report=True):
+        """
+        Integer ids of country codes, -1 for unknown and missing codes
+        """
+        codes = pd.Series(codes)
+        if isinstance(codes.dtype, pd.CategoricalDtype):
+            category_ids = self.codes.get_indexer(codes.cat.categories)
+            ids = np.append(category_ids, -1).take(codes.cat.codes.to_numpy())
+        else:
+            ids = self.codes.get_indexer(codes)
+
+        if report:
+            self.report_unknown(codes, ids)
+        return ids
+
+    def lookup(self, codes, attribute, report=True):
+        """
+        Attribute of every country code (missing for unknown codes),
+        indexed like codes if codes is a Series
+        """
+        ids = self.ids(codes, report)
+        index = codes.index if isinstance(codes, pd.Series) else None
+        return pd.Series(self.attributes[attribute].take(ids), index=index, name=attribute)
+
+    def values(self, attribute):
+        """
+        Sorted distinct values of an attribute (e.g. all regions)
+        """
+        values = pd.Series(self.attributes[attribute][:-1]).dropna().unique()
+        return pd.Index(sorted(values), name=attribute)
+
+    def join(self, df, on="Country", attributes=None, how="left"):
+        """
+        Appends country attributes (default: all) to df by its country
+        code column, like a left merge with the country table. An outer
+        join also appends a row for every country missing in df and
+        sorts the rows by code, like an outer merge
+        """
+        if how == "outer":
+            missing = self.codes[~self.codes.isin(df[on])]
+            df = pd.concat([df, pd.DataFrame({on: missing})], ignore_index=True)
+            df = df.sort_values(on, kind="stable", ignore_index=True)
+        else:
+            df = df.copy()
+
+        ids = self.ids(df[on])
+        for attribute in attributes if attributes is not None else list(self.attributes):
+            df[attribute] = self.attributes[attribute].take(ids)
+        return df
+
+    def report_unknown(self, codes, ids):
+        unknown = pd.Series(codes)[(ids == -1)]
+        unknown = unknown[unknown.notna() & (unknown.astype(str) != "")]
+        if len(unknown.index):
+            counts = unknown.astype(str).value_counts()
+            warnings.warn("Unknown country codes: %s" % ", ".join("%s (%d)" % item for item in counts.items()),
+                          UnknownCountryWarning, stacklevel=4)
+
+# Index built from the country table: (mtime of Country_information.xlsx, index)
+_country_index = None
+
+def country_index():
+    """
+    Returns the index of Country_information.xlsx, it is
+    only rebuilt if the file changed on disk
+    """
+    global _country_index
+    mtime = os.stat(auxiliary_file("Country_information")).st_mtime_ns
+    if _country_index is None or _country_index[0] != mtime:
+        _country_index = (mtime, CountryIndex(load_auxiliary_table("Country_information")))
+    return _country_index[1]
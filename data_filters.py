@@ -0,0 +1,141 @@
+"""
+Vectorized boolean-mask predicates on the charting tables
+
+Every predicate returns a boolean Series aligned with the index of
+the given frame, so predicates compose with &, | and ~ and can be
+used directly as df[mask]. Masks are computed once per frame (and
+parameters) and cached until the frame is garbage collected, hence
+frames passed to the predicates are treated as immutable.
+"""
+import functools
+import weakref
+import numpy as np
+import pandas as pd
+
+# Data sources not referring to a specific custodian
+UNSPECIFIC_DATA_SOURCES = ["Multiple", "Not precisely specified"]
+
+# Cached masks: (predicate, ids of frames, parameters) -> mask
+_mask_cache = {}
+
+def cached_mask(predicate):
+    """
+    Decorator caching the mask of a predicate per frame. All
+    DataFrame arguments are keyed by identity, all other
+    arguments by value
+    """
+    @functools.wraps(predicate)
+    def wrapper(*args):
+        frames = [arg for arg in args if isinstance(arg, pd.DataFrame)]
+        key = (predicate.__name__,) + tuple(id(arg) if isinstance(arg, pd.DataFrame) else _hashable(arg) for arg in args)
+
+        if key not in _mask_cache:
+            _mask_cache[key] = predicate(*args)
+            # Drop the mask as soon as one of the frames is gone
+            for frame in frames:
+                weakref.finalize(frame, _mask_cache.pop, key, None)
+
+        return _mask_cache[key]
+
+    return wrapper
+
+def clear_mask_cache():
+    """
+    Drops all cached masks
+    """
+    _mask_cache.clear()
+
+def _hashable(value):
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    if isinstance(value, (list, tuple, np.ndarray, pd.Index, pd.Series)):
+        return tuple(value)
+    return value
+
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Article table predicates
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+@cached_mask
+def data_origin_count(df, df_article_origin):
+    """
+    Number of data origins per article (not a mask, but
+    cached the same way as it is shared by several predicates)
+    """
+    return df['PMID'].map(df_article_origin['PMID'].value_counts()).fillna(0).astype(int)
+
+@cached_mask
+def single_data_origin(df, df_article_origin):
+    """
+    Articles with exactly one data origin other than "various"
+    """
+    return (data_origin_count(df, df_article_origin) == 1) & (df['Data origin'] != "various")
+
+@cached_mask
+def domestic_use(df):
+    """
+    Articles (or flows) where first author and data originate
+    from the same country
+    """
+    return df['Data origin'] == df['First author']
+
+@cached_mask
+def crossborder_article(df, df_article_origin):
+    """
+    Articles using data from several, unspecified ("various")
+    or foreign origins
+    """
+    return ~(single_data_origin(df, df_article_origin) & domestic_use(df))
+
+@cached_mask
+def same_author_origin(df):
+    """
+    Articles with first and senior author from the same country
+    (or no senior author given)
+    """
+    return (df['First author'] == df['Senior author']) | (df['Senior author'] == "")
+
+@cached_mask
+def assigned_icd_chapter(df):
+    """
+    Articles assigned to an ICD-10 chapter
+    """
+    return df['ICD-10 chapter'] != ""
+
+@cached_mask
+def uses_data_source(df, df_article_source, sources):
+    """
+    Articles using at least one of the given data sources
+    """
+    used = df_article_source.loc[df_article_source['Data source'].isin(list(sources)), 'PMID']
+    return df['PMID'].isin(used)
+
+"""
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+Link table predicates
+~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+"""
+
+@cached_mask
+def specific_data_origin(df):
+    """
+    Data origins referring to a specific country (not "various")
+    """
+    return df['Data origin'] != "various"
+
+@cached_mask
+def crossborder_origin(df):
+    """
+    Data origins different from the first author's country
+    (requires the first author joined to the link table)
+    """
+    return df['Data origin'] != df['First author']
+
+@cached_mask
+def specific_data_source(df):
+    """
+    Data sources referring to a specific custodian
+    """
+    return ~df['Data source'].isin(UNSPECIFIC_DATA_SOURCES)
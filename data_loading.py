@@ -0,0 +1,143 @@
+import time
+import pandas as pd
+from pandas.api.types import union_categoricals
+from instrumentation import traced
+
+CHARTING_FILE = "charting_results/charting_results_20240620.csv"
+
+# Declared schema of the charting results. Only these columns are read
+# ("Title" and "Reason for exclusion" are not used). Country codes and
+# ICD-10 chapters are categoricals, years small integers (read as nullable
+# integers, excluded articles may lack a year) and the Yes/No
+# fields are turned into booleans (see CHARTING_FLAGS). "Data source" and
+# "Data origin" are 1:n lists and stay strings in the article table, their
+# values are categoricals in the article_source/article_origin link tables
+CHARTING_DTYPES = {
+    "PMID": str,
+    "Include": "category",
+    "Publishing year": "Int16",
+    "ICD-10 chapter": "category",
+    "COVID-19 research": "category",
+    "First author": "category",
+    "Senior author": "category",
+    "Data source": str,
+    "Data origin": str,
+}
+CHARTING_COLUMNS = list(CHARTING_DTYPES)
+
+# Yes/No fields stored as booleans
+CHARTING_FLAGS = ["Include", "COVID-19 research"]
+
+@traced("load")
+def load_and_preprocess_charting(chart_file=CHARTING_FILE):
+    """
+    Loads the charting results and splits the 1:n fields
+    "Data source" and "Data origin" into long-form link
+    tables keyed by PMID (one row per article and value)
+
+    Returns the article table, the article_source and
+    the article_origin link table
+    """
+
+    # load data
+    df = pd.read_csv(chart_file, dtype=CHARTING_DTYPES, sep=";", usecols=CHARTING_COLUMNS)
+
+    # Apply the schema and remove excluded articles
+    df, df_article_source, df_article_origin = apply_charting_schema(df)
+
+    print("Loaded %d articles" % (len(df.index)))
+    return df, df_article_source, df_article_origin
+
+def iter_charting_chunks(chart_file=CHARTING_FILE, chunksize=100000):
+    """
+    Reads the charting results in chunks of rows and yields
+    the included articles of each chunk together with their
+    article_source and article_origin link tables
+    """
+    count = 0
+    for df in pd.read_csv(chart_file, dtype=CHARTING_DTYPES, sep=";", usecols=CHARTING_COLUMNS, chunksize=chunksize):
+        df, df_article_source, df_article_origin = apply_charting_schema(df)
+        count += len(df.index)
+        yield df, df_article_source, df_article_origin
+
+    print("Streamed %d articles" % count)
+
+def apply_charting_schema(df):
+    """
+    Converts the flags to booleans, keeps the included articles,
+    converts their years to int16, fills empty cells with empty strings and splits the 1:n fields.
+    First author, senior author and data origin share one categorical
+    dtype, so they can be compared with each other
+    """
+    for column in CHARTING_FLAGS:
+        df[column] = df[column] == "Yes"
+
+    # Remove excluded articles
+    df = df[df['Include']].copy()
+
+    # Every included article has a publishing year
+    missing_year = df['Publishing year'].isna()
+    if missing_year.any():
+        raise ValueError("Included articles without publishing year: %s" % ", ".join(df.loc[missing_year, 'PMID']))
+    df['Publishing year'] = df['Publishing year'].astype("int16")
+
+    # Fill empty cells with empty string
+    for column, dtype in CHARTING_DTYPES.items():
+        if dtype == "category" and column not in CHARTING_FLAGS:
+            df[column] = df[column].cat.remove_unused_categories()
+            if "" not in df[column].cat.categories:
+                df[column] = df[column].cat.add_categories("")
+        elif dtype is str:
+            df[column] = df[column].astype(object)
+    df = df.fillna('')
+
+    # split 1:n fields
+    df_article_source, df_article_origin = split_charting_lists(df)
+    df_article_source["Data source"] = df_article_source["Data source"].astype("category")
+
+    countries = union_categoricals([df['First author'], df['Senior author'], df_article_origin['Data origin'].astype("category")], sort_categories=True)
+    country_dtype = pd.CategoricalDtype(countries.categories)
+    df['First author'] = df['First author'].astype(country_dtype)
+    df['Senior author'] = df['Senior author'].astype(country_dtype)
+    df_article_origin["Data origin"] = df_article_origin["Data origin"].astype(country_dtype)
+
+    return df, df_article_source, df_article_origin
+
+def split_charting_lists(df):
+    """
+    Splits the 1:n fields column-wise and explodes them once
+    into the article_source and article_origin link tables
+    """
+    df_article_source = df[['PMID']].assign(**{"Data source": df["Data source"].str.split(",")})
+    df_article_source = df_article_source.explode("Data source", ignore_index=True)
+    df_article_source["Data source"] = df_article_source["Data source"].str.lstrip()
+
+    df_article_origin = df[['PMID']].assign(**{"Data origin": df["Data origin"].str.replace(" ", "", regex=False).str.strip().str.split(",")})
+    df_article_origin = df_article_origin.explode("Data origin", ignore_index=True)
+
+    return df_article_source, df_article_origin
+
+def compare_charting_loaders(chart_file=CHARTING_FILE, repeat=5):
+    """
+    Prints load time and memory of the article and link tables
+    for the declared schema and for reading all columns as strings
+    """
+    def load_strings():
+        df = pd.read_csv(chart_file, dtype=str, sep=";").fillna('')
+        df = df[df['Include'] == 'Yes']
+        return (df,) + split_charting_lists(df)
+
+    def load_schema():
+        df = pd.read_csv(chart_file, dtype=CHARTING_DTYPES, sep=";", usecols=CHARTING_COLUMNS)
+        return apply_charting_schema(df)
+
+    for name, load in [("dtype=str", load_strings), ("schema", load_schema)]:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            frames = load()
+        seconds = (time.perf_counter() - start) / repeat
+        memory = sum(frame.memory_usage(deep=True).sum() for frame in frames)
+        print("%-10s load: %7.2f ms, memory: %8.1f KiB" % (name, seconds * 1000, memory / 1024))
+
+if __name__ == "__main__":
+    compare_charting_loaders()
@@ -1,57 +1,59 @@
 import pandas as pd
+import data_filters as filters
+from auxiliary_tables import auxiliary_file, load_auxiliary_table
+from charting_aggregates import count_domestic_origin, count_icd, count_sources, count_year_covid, flow_rows, source_icd_rows, stream_charting_aggregates
+from country_index import country_index
+from count_matrices import CountMatrix, flow_matrix, flow_matrix_from_counts, source_icd_matrix
+from data_loading import CHARTING_FILE, load_and_preprocess_charting
+from pipeline import Stage, run_pipeline
+from scimagojr import load_scimagojr, scimagojr_files, scimagojr_wide
+from instrumentation import traced
 
-def load_and_preprocess_charting():
+# Years of the SCImago rankings used (None: all files in auxiliary_data/scimagojr)
+SCIMAGOJR_YEARS = None
+CITABLE_DOCUMENTS_FILE = "auxiliary_data/Citable_documents_per_country.xlsx"
 
-    # load data
-    chart_file = "charting_results/charting_results_20240620.csv"
-    df = pd.read_csv(chart_file, dtype=str, sep=";")
+# Indicators written per year to Citable_documents_per_country.xlsx
+CITABLE_DOCUMENTS_INDICATORS = ["Citable documents"]
 
-    # Fill empty cells with empty string
-    df = df.fillna('')
+# Country names used by SCImago that differ from Country_information.xlsx
+SCIMAGOJR_COUNTRY_NAMES = {"Russian Federation": "Russia"}
 
-    # Remove excluded articles
-    df = df[df['Include'] == 'Yes']
+@traced("preprocess")
+def preprocess_scimagojr(years=SCIMAGOJR_YEARS, indicators=CITABLE_DOCUMENTS_INDICATORS):
 
-    # split 1:n fields
-    df["Data source_list"] = df.apply(lambda row: [label.lstrip() for label in row["Data source"].split(",")], axis=1)
-    df["Data origin_list"] = df.apply(lambda row: row["Data origin"].replace(" ", "").strip().split(","), axis=1)
+    # Read all yearly rankings into one long table
+    df_long = load_scimagojr(years, indicators)
 
-    print("Loaded %d articles" % (len(df.index)))
-    return df
-
-def preprocess_scimagojr():
-
-    years = ["2018", "2019", "2020", "2021", "2022"]
-
-    df = pd.DataFrame()
-    for year in years:
-        # read csv
-        df_temp = pd.read_excel(f"auxiliary_data/scimagojr/scimagojr country rank {year}.xlsx", sheet_name='Sheet1', skiprows=0)[["Country", "Citable documents"]]
-        df_temp.rename(columns={"Citable documents": f"Citable documents_{year}"}, inplace=True)
-
-        if year == years[0]:
-            df = df_temp
-        else:
-            df = pd.merge(df, df_temp, how="outer", on="Country")
+    # One column per indicator and year
+    df = scimagojr_wide(df_long)
 
     df.rename(columns={"Country": "Name (Country)"}, inplace=True)
-    df["Citable documents_total"] = df[[f'Citable documents_{year}' for year in years]].sum(axis=1)
+    df["Name (Country)"] = df["Name (Country)"].replace(SCIMAGOJR_COUNTRY_NAMES)
+    df["Citable documents_total"] = df[[f'Citable documents_{year}' for year in df_long["Year"].unique()]].sum(axis=1)
 
-    df.to_excel("auxiliary_data/Citable_documents_per_country.xlsx", sheet_name='Citable_documents_per_country', engine="openpyxl", index=False)
+    df.to_excel(CITABLE_DOCUMENTS_FILE, sheet_name='Citable_documents_per_country', engine="openpyxl", index=False)
 
+@traced("preprocess")
 def preprocess_figure_1(df):
+    return preprocess_figure_1_from_aggregates({"year_covid": count_year_covid(df)})
+
+@traced("preprocess")
+def preprocess_figure_1_from_aggregates(aggregates):
 
-    # Group by year and COVID-19 research status, and then count the entries
-    df = df.groupby(['Publishing year', 'COVID-19 research']).size().unstack(fill_value=0)
+    # Turn the counts per year and COVID-19 research status into columns (years
+    # in chronological order, combined chunk counts are in order of appearance)
+    df = aggregates["year_covid"].sort_index(level='Publishing year').unstack(fill_value=0)
 
     # Reset index to turn the multi-index into columns
     df.reset_index(inplace=True)
 
     # Rename the 'Publishing year Pubmed' column to 'Year'
-    df.rename(columns={'Publishing year': 'Year', 'No': 'Count (Non-COVID-19-related)', 'Yes':'Count (COVID-19-related)'}, inplace=True)
+    df.rename(columns={'Publishing year': 'Year', False: 'Count (Non-COVID-19-related)', True: 'Count (COVID-19-related)'}, inplace=True)
 
     # Read auxiliary data
-    auxiliary_data = pd.read_excel("auxiliary_data/PubMed_number_paper_published.xlsx", sheet_name='PubMed_number_paper_published', skiprows=0, dtype=str)
+    auxiliary_data = load_auxiliary_table("PubMed_number_paper_published")
+    auxiliary_data['Year'] = auxiliary_data['Year'].astype(df['Year'].dtype)
 
     # Merge the DataFrames
     df = pd.merge(df, auxiliary_data, on='Year')
@@ -65,36 +67,25 @@ def preprocess_figure_1(df):
     df['Normalized (Non-COVID-19-related)'] = (df['Count (Non-COVID-19-related)'] / df['Paper-published-total']) * scaling_factor
     df['Normalized (COVID-19-related)'] = (df['Count (COVID-19-related)'] / df['Paper-published-total']) * scaling_factor
 
-    # Save to xlsx
-    with pd.ExcelWriter('data_figures.xlsx', engine="openpyxl",  mode="a", if_sheet_exists='replace') as writer:
-        df.to_excel(writer, sheet_name='data_figure_1', index=False)
-
-
-def preprocess_figure_2(df):
-
-    def filter_only_single_data_origin(row):
-        origin_list = row['Data origin_list']
-        origin = origin_list[0]
-        return len(origin_list) == 1 and origin != "various"
+    return df
 
-    def filter_other(row):
-        return row["Citable documents_total"] <= top_20_threshold or pd.isna(row["Count (Data origin)"])
 
-    def filter_domestic_use(row):
-        return row['Data origin'] == row["First author"]
+@traced("preprocess")
+def preprocess_figure_2(df, df_article_origin):
+    return preprocess_figure_2_from_aggregates({"domestic_origin": count_domestic_origin(df, df_article_origin)})
 
-    # Remove records with more than one data origin
-    df = df[df.apply(filter_only_single_data_origin, axis=1)]
-    # Filter articles where first author and data originate from the same country
-    df = df[df.apply(filter_domestic_use, axis=1)]
+@traced("preprocess")
+def preprocess_figure_2_from_aggregates(aggregates):
 
-    # Count occurrences of data origin
-    data_origin_counts = df['Data origin'].value_counts().reset_index()
+    # Count occurrences of data origin for records with a single data origin
+    # where first author and data originate from the same country
+    data_origin_counts = aggregates["domestic_origin"].sort_values(ascending=False).reset_index()
     data_origin_counts.columns = ['Country', 'Count (Data origin)']
 
-    auxiliary_data_country_information = pd.read_excel("auxiliary_data/Country_information.xlsx", sheet_name='Country_information', skiprows=0)[["Country", "Name (Country)", "Region (Country)"]]
-    auxiliary_data_citable_documents = pd.read_excel("auxiliary_data/Citable_documents_per_country.xlsx", sheet_name='Citable_documents_per_country', skiprows=0)[["Name (Country)", "Citable documents_total"]]
-    df = pd.merge(data_origin_counts, auxiliary_data_country_information, how="outer", on="Country")
+    # Append name and region of all countries
+    df = country_index().join(data_origin_counts, attributes=["Name (Country)", "Region (Country)"], how="outer")
+
+    auxiliary_data_citable_documents = load_auxiliary_table("Citable_documents_per_country", ["Name (Country)", "Citable documents_total"])
     df = pd.merge(df, auxiliary_data_citable_documents, on='Name (Country)', how='outer')
 
     # Calculate top-20 threshold
@@ -106,8 +97,9 @@ def preprocess_figure_2(df):
     df["Data origin per 1000 citable documents"] = df["Count (Data origin)"] * 1000 / df["Citable documents_total"]
 
     # Split countries into top-20 and "other"
-    df_other = df[df.apply(filter_other, axis=1)]
-    df = df[~df.apply(filter_other, axis=1)]
+    mask_other = (df["Citable documents_total"] <= top_20_threshold) | df["Count (Data origin)"].isna()
+    df_other = df[mask_other]
+    df = df[~mask_other]
 
     # Sort
     df = df.sort_values(['Region (Country)', 'Data origin per 1000 citable documents'], ascending=[True, False])
@@ -119,41 +111,59 @@ def preprocess_figure_2(df):
                  "Data origin per 1000 citable documents": df_other["Count (Data origin)"].sum() * 1000 / df_other["Citable documents_total"].sum()}
     df = df._append(row_other, ignore_index=True)
 
-    # Save to xlsx
-    with pd.ExcelWriter('data_figures.xlsx', engine="openpyxl",  mode="a", if_sheet_exists='replace') as writer:
-        df.to_excel(writer, sheet_name='data_figure_2', index=False)
-
-def preprocess_figure_3(df, other_threshold_3a=10, other_threshold_3b=2):
+    return df
 
-    def filter_crossborder_origin(row):
-        return row['Data origin_list'] != row["First author"]
+@traced("preprocess")
+def preprocess_figure_3(df, df_article_origin, other_threshold_3a=10, other_threshold_3b=2):
 
-    def filter_various(row):
-        return row['Data origin_list'] != "various"
+    # Join the first author to every specific data origin of an article
+    df = flow_rows(df, df_article_origin)
 
-    df = df.explode('Data origin_list')
-    df = df[df.apply(filter_various, axis=1)]
-    df_crossborder = df[df.apply(filter_crossborder_origin, axis=1)]
-    df_domestic = df[~df.apply(filter_crossborder_origin, axis=1)]
+    # Count the flows per first author and data origin
+    flows = flow_matrix(df)
+    df_counts = preprocess_figure_3a(flows, other_threshold_3a)
 
     """ 
     ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    Calculate data for figure 3a
+    Calculate data for figure 3b
     ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
     """
 
+    # Keep crossborder flows of combinations occurring at least "other_threshold_3b" times
+    pair_counts = flows.off_diagonal().pair_counts(df['First author'], df['Data origin'])
+    df_combinations = df.loc[pair_counts >= other_threshold_3b, ['First author', 'Data origin']]
+
+    return df_counts, append_country_names_figure_3b(df_combinations)
+
+@traced("preprocess")
+def preprocess_figure_3_from_aggregates(aggregates, other_threshold_3a=10, other_threshold_3b=2):
+
+    flows = flow_matrix_from_counts(aggregates["flows"])
+    df_counts = preprocess_figure_3a(flows, other_threshold_3a)
+
+    # Keep crossborder combinations occurring at least "other_threshold_3b" times, one row per flow
+    pairs = flows.off_diagonal().pairs(other_threshold_3b)
+    df_combinations = pairs.index.repeat(pairs.values).to_frame(index=False)
+
+    return df_counts, append_country_names_figure_3b(df_combinations)
+
+@traced("preprocess")
+def preprocess_figure_3a(flows, other_threshold_3a=10):
+    """
+    Calculates the data for figure 3a from the
+    first author x data origin flow matrix
+    """
     # Count occurrences in each specific column
-    data_origin_counts_crossborder = df_crossborder['Data origin_list'].value_counts().reset_index()
+    data_origin_counts_crossborder = flows.off_diagonal().column_counts().reset_index()
     data_origin_counts_crossborder.columns = ['Country', 'Count (Data origin crossborder)']
-    data_origin_counts_domestic = df_domestic['Data origin_list'].value_counts().reset_index()
+    data_origin_counts_domestic = flows.diagonal().column_counts().reset_index()
     data_origin_counts_domestic.columns = ['Country', 'Count (Data origin domestic)']
 
     # Merge the DataFrames on 'Country'
     df_counts = pd.merge(data_origin_counts_crossborder, data_origin_counts_domestic, on='Country', how='outer')
 
-    # Read external CSV to append the name of countries
-    auxiliary_data = pd.read_excel("auxiliary_data/Country_information.xlsx", sheet_name='Country_information', skiprows=0)[["Country", "Name (Country)"]]
-    df_counts = pd.merge(df_counts, auxiliary_data, on='Country', how='left')
+    # Append the name of countries
+    df_counts = country_index().join(df_counts, attributes=["Name (Country)"])
 
     # Fill missing values with 0
     df_counts.fillna(0, inplace=True)
@@ -188,38 +198,33 @@ def preprocess_figure_3(df, other_threshold_3a=10, other_threshold_3b=2):
                  "Distribution (Data origin domestic)": df_counts_other["Distribution (Data origin domestic)"].sum()}
     df_counts = df_counts._append(row_other, ignore_index=True)
 
-    """ 
-    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    Calculate data for figure 3b
-    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
-    """
+    return df_counts
+
+def append_country_names_figure_3b(df_combinations):
 
-    # Filter combinations that do occure less than "other_threshold_5b" times
-    df_combinations = df_crossborder.groupby(['First author', 'Data origin_list']).filter(lambda x: len(x) >= other_threshold_3b)[['First author', 'Data origin_list']]
     # Append full country name
-    df_combinations = pd.merge(df_combinations, auxiliary_data, left_on='First author', right_on='Country', how='left')
-    df_combinations = df_combinations.rename(columns={"Name (Country)": "Name (Country first author)"})
-    df_combinations = pd.merge(df_combinations, auxiliary_data, left_on='Data origin_list', right_on='Country', how='left')
-    df_combinations = df_combinations.rename(columns={"Name (Country)": "Name (Country data origin)"})
+    countries = country_index()
+    df_combinations = df_combinations.reset_index(drop=True)
+    df_combinations["Name (Country first author)"] = countries.lookup(df_combinations['First author'], "Name (Country)")
+    df_combinations["Name (Country data origin)"] = countries.lookup(df_combinations['Data origin'], "Name (Country)")
+    df_combinations = df_combinations.rename(columns={"Data origin": "Data origin_list"})
     df_combinations = df_combinations[["First author", "Data origin_list",	"Name (Country first author)", "Name (Country data origin)"]]
 
-    with pd.ExcelWriter('data_figures.xlsx', engine="openpyxl", mode="a", if_sheet_exists='replace') as writer:
-        df_counts.to_excel(writer, sheet_name='data_figure_3a', index=False)
-        df_combinations.to_excel(writer, sheet_name='data_figure_3b', index=False)
+    return df_combinations
 
+@traced("preprocess")
 def preprocess_figure_S2(df, other_threshold = 5):
-    def filter_only_assigned_ICD_chapter(row):
-        return row['ICD-10 chapter'] != ""
+    return preprocess_figure_S2_from_aggregates({"icd": count_icd(df)}, other_threshold)
 
-    # Remove records not assigned to a chapter
-    df_filtered = df[df.apply(filter_only_assigned_ICD_chapter, axis=1)]
+@traced("preprocess")
+def preprocess_figure_S2_from_aggregates(aggregates, other_threshold = 5):
 
-    # Count occurrences of chapters
-    df = df_filtered['ICD-10 chapter'].value_counts().reset_index()
+    # Count occurrences of chapters for records assigned to a chapter
+    df = aggregates["icd"].sort_values(ascending=False).reset_index()
     df.columns = ['ICD-10 chapter', 'Count (ICD-10 chapter)']
 
     # Read external CSV with total number of articles published
-    auxiliary_data = pd.read_excel("auxiliary_data/ICD-10_chapter_mapping.xlsx", sheet_name='ICD-10_chapter_mapping', skiprows=0, dtype=str)
+    auxiliary_data = load_auxiliary_table("ICD-10_chapter_mapping")
     df = pd.merge(df, auxiliary_data, on='ICD-10 chapter', how='outer')
 
     # Fill missing values with 0
@@ -242,26 +247,21 @@ def preprocess_figure_S2(df, other_threshold = 5):
     row_other = {"ICD-10 chapter": "other", "Name (ICD-10 chapter)": "other", "Count (ICD-10 chapter)": df_other["Count (ICD-10 chapter)"].sum(), "Distribution (ICD-10 chapter)": df_other["Distribution (ICD-10 chapter)"].sum()}
     df = df._append(row_other, ignore_index=True)
 
-    # Save to xlsx
-    with pd.ExcelWriter('data_figures.xlsx', engine="openpyxl",  mode="a", if_sheet_exists='replace') as writer:
-        df.to_excel(writer, sheet_name='data_figure_S2', index=False)
-
-def preprocess_figure_4(df, other_threshold = 5):
-
-    def filter_only_specific_source(row):
-        return row['Data source_list'] != "Multiple" and row['Data source_list'] != "Not precisely specified"
+    return df
 
-    df = df.explode('Data source_list')
+@traced("preprocess")
+def preprocess_figure_4(df_article_source, other_threshold = 5):
+    return preprocess_figure_4_from_aggregates({"sources": count_sources(df_article_source)}, other_threshold)
 
-    # Remove records not assigned to a specific source
-    df = df[df.apply(filter_only_specific_source, axis=1)]
+@traced("preprocess")
+def preprocess_figure_4_from_aggregates(aggregates, other_threshold = 5):
 
-    # Count occurrences of sources
-    df = df['Data source_list'].value_counts().reset_index()
+    # Count occurrences of sources for records assigned to a specific source
+    df = aggregates["sources"].sort_values(ascending=False).reset_index()
     df.columns = ['Data source', 'Count (Data source)']
 
     # Read external CSV with total number of articles published
-    auxiliary_data = pd.read_excel("auxiliary_data/Data_source_information.xlsx", sheet_name='Data_source_information', skiprows=0, dtype=str)
+    auxiliary_data = load_auxiliary_table("Data_source_information")
     df = pd.merge(df, auxiliary_data, on='Data source', how='left')
 
     # Convert float counts to integers
@@ -270,55 +270,116 @@ def preprocess_figure_4(df, other_threshold = 5):
     # Remove uncommon custodians
     df = df[df["Count (Data source)"] >= other_threshold]
 
-    # Save to xlsx
-    with pd.ExcelWriter('data_figures.xlsx', engine="openpyxl",  mode="a", if_sheet_exists='replace') as writer:
-        df.to_excel(writer, sheet_name='data_figure_4', index=False)
+    return df
 
-def preprocess_figure_5(df, other_threshold_source=5, other_threshold_icd=15):
+@traced("preprocess")
+def preprocess_figure_5(df, df_article_source, other_threshold_source=5, other_threshold_icd=15):
 
-    def filter_only_specific_custodian(row):
-        return row['Data source_list'] != "Multiple" and row['Data source_list'] != "Not precisely specified"
+    # Join the ICD-10 chapter to every data source of an article
+    df = source_icd_rows(df, df_article_source)
 
-    def filter_only_assigned_ICD_chapter(row):
-        return row['ICD-10 chapter'] != ""
+    # Remove records not assigned to a specific custodian
+    df = df[filters.specific_data_source(df)]
 
-    df = df.explode('Data source_list')
+    # Remove uncommon data sources and records not assigned to a specific ICD-10 chapter
+    source_icd = source_icd_matrix(df).filter_rows(other_threshold_source).drop_columns([""])
+    df = df[df['Data source'].isin(source_icd.rows) & filters.assigned_icd_chapter(df)]
 
-    # Remove records not assigned to a specific custodian
-    df= df[df.apply(filter_only_specific_custodian, axis=1)]
+    # Replace uncommon ICD-10 chapters with "other"
+    common_chapters = source_icd.common_columns(other_threshold_icd)
+    df['ICD-10 chapter'] = df['ICD-10 chapter'].astype(object).where(df['ICD-10 chapter'].isin(common_chapters), 'other')
 
-    # Remove uncommon data sources
-    df = df.groupby('Data source_list').filter(lambda x: len(x) >= other_threshold_source)
+    return append_names_figure_5(df)
 
-    # Remove records not assigned to a specific ICD-10 chapter
-    df = df[df.apply(filter_only_assigned_ICD_chapter, axis=1)]
+@traced("preprocess")
+def preprocess_figure_5_from_aggregates(aggregates, other_threshold_source=5, other_threshold_icd=15):
+
+    # Remove uncommon data sources and records not assigned to a specific ICD-10 chapter
+    source_icd = CountMatrix.from_counts(aggregates["source_icd"]).filter_rows(other_threshold_source).drop_columns([""])
 
     # Replace uncommon ICD-10 chapters with "other"
-    counts = df['ICD-10 chapter'].value_counts()
-    mask = df['ICD-10 chapter'].map(counts)
-    df['ICD-10 chapter'] = df['ICD-10 chapter'].where(mask >= other_threshold_icd, 'other')
+    source_icd = source_icd.collapse_columns(other_threshold_icd, other="other")
+
+    # One row per article and data source
+    df = source_icd.expand()
+
+    return append_names_figure_5(df)
 
-    # Remove old, unprocessed "Data source" column and rename the exploded list to "Data source"
-    df = df.drop('Data source', axis=1)
-    df = df.rename(columns={"Data source_list":"Data source"})
+def append_names_figure_5(df):
 
     # Read external CSV to add name of ICD chapter and abbreviation of custodian
-    auxiliary_data = pd.read_excel("auxiliary_data/Data_source_information.xlsx", sheet_name='Data_source_information', skiprows=0, dtype=str)
+    auxiliary_data = load_auxiliary_table("Data_source_information")
     df = pd.merge(df, auxiliary_data, on='Data source', how='left')
-    auxiliary_data = pd.read_excel("auxiliary_data/ICD-10_chapter_mapping.xlsx", sheet_name='ICD-10_chapter_mapping', skiprows=0, dtype=str)
+    auxiliary_data = load_auxiliary_table("ICD-10_chapter_mapping")
     df = pd.merge(df, auxiliary_data, on='ICD-10 chapter', how='left')
 
     df = df[["Abbreviation (Data source)", "Name (ICD-10 chapter)"]]
 
-    # Save to xlsx
-    with pd.ExcelWriter('data_figures.xlsx', engine="openpyxl",  mode="a", if_sheet_exists='replace') as writer:
-        df.to_excel(writer, sheet_name='data_figure_5', index=False)
-
-df_raw = load_and_preprocess_charting()
-#preprocess_scimagojr()
-preprocess_figure_1(df_raw)
-preprocess_figure_2(df_raw)
-preprocess_figure_3(df_raw)
-preprocess_figure_S2(df_raw)
-preprocess_figure_4(df_raw)
-preprocess_figure_5(df_raw)
\ No newline at end of file
+    return df
+
+def charting_stages(chunksize=None):
+    """
+    Stages computing the figure sheets from the charting results, either
+    from the full table in memory or, if chunksize is given, from
+    aggregates streamed chunk by chunk (sheets 3b and 5 then only
+    differ in row order, the figures are the same)
+    """
+    if chunksize is None:
+        charting = Stage("charting", load_and_preprocess_charting, files=[CHARTING_FILE],
+                         outputs=["articles", "article_source", "article_origin"])
+        figures = {
+            "figure_1": (preprocess_figure_1, ["articles"]),
+            "figure_2": (preprocess_figure_2, ["articles", "article_origin"]),
+            "figure_3": (preprocess_figure_3, ["articles", "article_origin"]),
+            "figure_S2": (preprocess_figure_S2, ["articles"]),
+            "figure_4": (preprocess_figure_4, ["article_source"]),
+            "figure_5": (preprocess_figure_5, ["articles", "article_source"]),
+        }
+    else:
+        charting = Stage("charting", stream_charting_aggregates, files=[CHARTING_FILE],
+                         params={"chunksize": chunksize}, outputs=["aggregates"])
+        figures = {
+            "figure_1": (preprocess_figure_1_from_aggregates, ["aggregates"]),
+            "figure_2": (preprocess_figure_2_from_aggregates, ["aggregates"]),
+            "figure_3": (preprocess_figure_3_from_aggregates, ["aggregates"]),
+            "figure_S2": (preprocess_figure_S2_from_aggregates, ["aggregates"]),
+            "figure_4": (preprocess_figure_4_from_aggregates, ["aggregates"]),
+            "figure_5": (preprocess_figure_5_from_aggregates, ["aggregates"]),
+        }
+
+    return [
+        charting,
+        Stage("figure_1", figures["figure_1"][0], inputs=figures["figure_1"][1],
+              files=[auxiliary_file("PubMed_number_paper_published")], sheets=["data_figure_1"]),
+        Stage("figure_2", figures["figure_2"][0], inputs=figures["figure_2"][1],
+              files=[auxiliary_file("Country_information"), CITABLE_DOCUMENTS_FILE], sheets=["data_figure_2"]),
+        Stage("figure_3", figures["figure_3"][0], inputs=figures["figure_3"][1],
+              files=[auxiliary_file("Country_information")], params={"other_threshold_3a": 10, "other_threshold_3b": 2},
+              sheets=["data_figure_3a", "data_figure_3b"]),
+        Stage("figure_S2", figures["figure_S2"][0], inputs=figures["figure_S2"][1],
+              files=[auxiliary_file("ICD-10_chapter_mapping")], params={"other_threshold": 5}, sheets=["data_figure_S2"]),
+        Stage("figure_4", figures["figure_4"][0], inputs=figures["figure_4"][1],
+              files=[auxiliary_file("Data_source_information")], params={"other_threshold": 5}, sheets=["data_figure_4"]),
+        Stage("figure_5", figures["figure_5"][0], inputs=figures["figure_5"][1],
+              files=[auxiliary_file("Data_source_information"), auxiliary_file("ICD-10_chapter_mapping")],
+              params={"other_threshold_source": 5, "other_threshold_icd": 15}, sheets=["data_figure_5"]),
+    ]
+
+# Rows per chunk for streaming the charting results (None reads them at once),
+# set this for charting exports that do not fit into memory
+STREAMING_CHUNKSIZE = None
+
+def preprocessing_stages(chunksize=STREAMING_CHUNKSIZE):
+    """
+    Preprocessing stages with their inputs, only stages with
+    changed inputs are recomputed (see charting_stages())
+    """
+    return [
+        Stage("scimagojr", preprocess_scimagojr, files=list(scimagojr_files().values()),
+              params={"years": SCIMAGOJR_YEARS, "indicators": CITABLE_DOCUMENTS_INDICATORS}, targets=[CITABLE_DOCUMENTS_FILE]),
+    ] + charting_stages(chunksize)
+
+STAGES = preprocessing_stages()
+
+if __name__ == "__main__":
+    run_pipeline(STAGES)
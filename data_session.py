@@ -0,0 +1,155 @@
+"""
+Shared data session for the statistics, the threshold sweep and the CLI
+
+A session loads the charting results, the article features, the
+auxiliary tables and the figure sheets on first access and keeps them
+for later use, nothing is loaded when a session is created or this
+module is imported. Statistics and preprocessing functions can be
+called on the session with run(), which fills in their table,
+figure sheet and auxiliary table arguments by parameter name. A session created with shared_dir attaches
+to the tables published there (see shared_tables.py) instead of
+loading them, e.g. in worker processes.
+"""
+import functools
+import inspect
+import data_filters as filters
+from auxiliary_tables import load_auxiliary_table
+from data_loading import CHARTING_FILE, load_and_preprocess_charting
+from figure_data import read_figure_data
+
+# Session attributes passed to run() by parameter name
+RUN_ARGUMENTS = {
+    "df": "df_features",
+    "df_charting": "df_charting",
+    "df_features": "df_features",
+    "df_article_source": "df_article_source",
+    "df_article_origin": "df_article_origin",
+    "aggregates": "aggregates",
+}
+
+# Figure sheets passed to run() by parameter name
+RUN_FIGURE_FRAMES = {
+    "df_figure_1": "data_figure_1",
+    "df_figure_2": "data_figure_2",
+}
+
+# Auxiliary tables passed to run() by parameter name
+RUN_AUXILIARY_TABLES = {
+    "df_countries": "Country_information",
+    "df_citable_documents": "Citable_documents_per_country",
+}
+
+class DataSession:
+    """
+    Lazily loaded and memoized tables of one charting export
+    """
+    def __init__(self, chart_file=CHARTING_FILE, shared_dir=None):
+        self.chart_file = chart_file
+        self.shared_dir = shared_dir
+        self._auxiliary_tables = {}
+        self._figure_frames = {}
+
+    @functools.cached_property
+    def charting(self):
+        """
+        The article table and the article_source and article_origin link tables
+        """
+        if self.shared_dir:
+            from shared_tables import CHARTING_TABLES, attach_table
+            return tuple(attach_table(name, self.shared_dir) for name in CHARTING_TABLES)
+        return load_and_preprocess_charting(self.chart_file)
+
+    @property
+    def df_charting(self):
+        return self.charting[0]
+
+    @property
+    def df_article_source(self):
+        return self.charting[1]
+
+    @property
+    def df_article_origin(self):
+        return self.charting[2]
+
+    @functools.cached_property
+    def df_features(self):
+        """
+        The article table with the article flags of the statistics
+        """
+        if self.shared_dir:
+            from shared_tables import FEATURES_TABLE, attach_table, is_published
+            if is_published(FEATURES_TABLE, self.shared_dir):
+                return attach_table(FEATURES_TABLE, self.shared_dir)
+        from article_features import article_features
+        return article_features(*self.charting)
+
+    @functools.cached_property
+    def aggregates(self):
+        """
+        Per-figure counts of the charting results
+        """
+        from charting_aggregates import aggregate_charting
+        return aggregate_charting(*self.charting)
+
+    def auxiliary_table(self, name, columns=None):
+        """
+        Returns an auxiliary table by name (a copy, like load_auxiliary_table())
+        """
+        if name not in self._auxiliary_tables:
+            self._auxiliary_tables[name] = load_auxiliary_table(name)
+        df = self._auxiliary_tables[name]
+        return (df if columns is None else df[columns]).copy()
+
+    def figure_frame(self, sheet_name):
+        """
+        Returns a figure sheet written by the preprocessing (a copy)
+        """
+        if sheet_name not in self._figure_frames:
+            if self.shared_dir:
+                from shared_tables import attach_table
+                self._figure_frames[sheet_name] = attach_table(sheet_name, self.shared_dir)
+            else:
+                self._figure_frames[sheet_name] = read_figure_data(sheet_name)
+        return self._figure_frames[sheet_name].copy()
+
+    def run(self, function, *args, **kwargs):
+        """
+        Calls function with the session tables, figure sheets and
+        auxiliary tables for all parameters named in RUN_ARGUMENTS,
+        RUN_FIGURE_FRAMES and RUN_AUXILIARY_TABLES that are not
+        passed explicitly
+        """
+        bound = inspect.signature(function).bind_partial(*args, **kwargs)
+        for name in inspect.signature(function).parameters:
+            if name in bound.arguments:
+                continue
+            if name in RUN_ARGUMENTS:
+                bound.arguments[name] = getattr(self, RUN_ARGUMENTS[name])
+            elif name in RUN_FIGURE_FRAMES:
+                bound.arguments[name] = self.figure_frame(RUN_FIGURE_FRAMES[name])
+            elif name in RUN_AUXILIARY_TABLES:
+                bound.arguments[name] = self.auxiliary_table(RUN_AUXILIARY_TABLES[name])
+        return function(*bound.args, **bound.kwargs)
+
+    def clear(self):
+        """
+        Drops all loaded tables, e.g. after the charting results
+        or the figure data were rewritten
+        """
+        for name in ["charting", "df_features", "aggregates"]:
+            self.__dict__.pop(name, None)
+        self._auxiliary_tables.clear()
+        self._figure_frames.clear()
+        filters.clear_mask_cache()
+
+# Session shared by all users in this process, see get_session()
+_session = None
+
+def get_session():
+    """
+    Returns the shared session of the default charting export
+    """
+    global _session
+    if _session is None:
+        _session = DataSession()
+    return _session
@@ -1,37 +1,39 @@
+import numpy as np
 import pandas as pd
+import bootstrap as bs
+import permutation_tests as pt
 from tabulate import tabulate
-import statsmodels.api as smApi
-import statsmodels.regression.linear_model as smReg
+from charting_aggregates import count_values, flow_rows, source_icd_rows
+from country_index import country_index
+from count_matrices import flow_matrix, source_icd_matrix
+from data_session import get_session
+from instrumentation import traced
 
-def load_and_preprocess_charting():
+# Tables of the shared session that were loaded on import before
+SESSION_TABLES = ["df_charting", "df_article_source", "df_article_origin", "df_features"]
 
-    # load data
-    chart_file = "charting_results/charting_results_20240620.csv"
-    df = pd.read_csv(chart_file, dtype=str, sep=";")
+def __getattr__(name):
+    # Module attributes df_charting etc. are loaded on first access
+    if name in SESSION_TABLES:
+        return getattr(get_session(), name)
+    raise AttributeError("module %r has no attribute %r" % (__name__, name))
 
-    # Fill empty cells with empty string
-    df = df.fillna('')
+# Every statistic prints its results (unless verbose=False) and returns them as dict
 
-    # Remove excluded articles
-    df = df[df['Include'] == 'Yes']
-
-    # split 1:n fields
-    df["Data source_list"] = df.apply(lambda row: [label.lstrip() for label in row["Data source"].split(",")], axis=1)
-    df["Data origin_list"] = df.apply(lambda row: row["Data origin"].replace(" ", "").strip().split(","), axis=1)
-
-    print("Loaded %d articles" % (len(df.index)))
-    return df
-
-df_charting = load_and_preprocess_charting()
-
-def additional_statistics_figure_1():
+@traced("statistics")
+def additional_statistics_figure_1(df_figure_1, n_resamples=bs.N_RESAMPLES, seed=0, workers=None, verbose=True):
     """
     Calculates the slope and p-value
     for the regressions shown in Figure 2
+    and bootstrap confidence intervals
+    of the slopes (df_figure_1 is the
+    data_figure_1 sheet)
     """
+    # statsmodels takes seconds to import and is only needed here
+    import statsmodels.api as smApi
+    import statsmodels.regression.linear_model as smReg
 
-    # load figure 2 data
-    df = pd.read_excel("data_figures.xlsx", sheet_name="data_figure_1", engine="openpyxl")
+    df = df_figure_1
 
     # Example years corresponding to your data
     years = list(range(len(df["Year"])))
@@ -39,28 +41,39 @@ def additional_statistics_figure_1():
     # Adding a column of ones to include an intercept in the model
     X = smApi.add_constant(years)
 
-    model = smReg.OLS(df["Normalized (Non-COVID-19-related)"]+ df["Normalized (COVID-19-related)"], X).fit()
-    print("Normalized all [2018-2022] | Slope: %.3f, p-value: %.5f" % (model.params[1], model.pvalues[1]))
+    series = {"all": df["Normalized (Non-COVID-19-related)"] + df["Normalized (COVID-19-related)"],
+              "non COVID": df["Normalized (Non-COVID-19-related)"]}
 
-    model = smReg.OLS(df["Normalized (Non-COVID-19-related)"], X).fit()
-    print("Normalized non COVID [2018-2022] | Slope: %.3f, p-value: %.5f" % (model.params[1], model.pvalues[1]))
+    results = {}
+    for name, values in series.items():
+        model = smReg.OLS(values, X).fit()
+        results[name] = {"slope": model.params.iloc[1], "p_value": model.pvalues.iloc[1]}
+        if verbose:
+            print("Normalized %s [2018-2022] | Slope: %.3f, p-value: %.5f" % (name, results[name]["slope"], results[name]["p_value"]))
+
+    # Bootstrap the (year, normalized count) pairs
+    for name, values in series.items():
+        estimates = bs.bootstrap(np.column_stack([years, values]), bs.slope, n_resamples, seed, workers)
+        results[name]["slope_ci"] = bs.confidence_interval(estimates)
+        if verbose:
+            print("Normalized %s [2018-2022] | Slope 95%% CI: [%.3f, %.3f]" % ((name,) + results[name]["slope_ci"]))
+
+    return results
 
 #additional_statistics_figure_2()
 
-def calculate_EU_contribution(df):
+@traced("statistics")
+def calculate_EU_contribution(df, n_resamples=bs.N_RESAMPLES, seed=0, workers=None, verbose=True):
     """
     Calculates contributions per country and the EUs contribution
+    with bootstrap confidence intervals of the EU shares
     """
-    def filter_only_single_data_origin(row):
-        origin_list = row['Data origin_list']
-        origin = origin_list[0]
-        return len(origin_list) == 1 and origin != "various"
-
     # Remove records with more than one data origin
-    df = df[df.apply(filter_only_single_data_origin, axis=1)]
+    df = df[df["Single data origin"]]
+    df_articles = df
 
     # Count occurrences in each specific column
-    first_author_counts = df['First author'].value_counts().reset_index()
+    first_author_counts = count_values(df['First author']).reset_index()
     first_author_counts.columns = ['Country', 'Count (First author)']
     data_origin_counts = df['Data origin'].value_counts().reset_index()
     data_origin_counts.columns = ['Country', 'Count (Data origin)']
@@ -68,11 +81,8 @@ def calculate_EU_contribution(df):
     # Merge the DataFrames on 'Country'
     df = pd.merge(first_author_counts, data_origin_counts, on='Country', how='outer')
 
-    # Read external CSV with total number of articles published
-    auxiliary_data = \
-    pd.read_excel("auxiliary_data/Country_information.xlsx", sheet_name='Country_information', skiprows=0)[
-        ["Country", "Name (Country)", "Region (Country)"]]
-    df = pd.merge(df, auxiliary_data, on='Country', how='outer')
+    # Append name and region of all countries
+    df = country_index().join(df, attributes=["Name (Country)", "Region (Country)"], how="outer")
 
     # Fill missing values with 0
     df.fillna(0, inplace=True)
@@ -85,7 +95,9 @@ def calculate_EU_contribution(df):
     df["Distribution (First author)"] = df["Count (First author)"] * 100 / df["Count (First author)"].sum()
     df["Distribution (Data origin)"] = df["Count (Data origin)"] * 100 / df["Count (Data origin)"].sum()
 
-    print(tabulate(df, headers='keys', tablefmt='psql'))
+    df_countries = df
+    if verbose:
+        print(tabulate(df, headers='keys', tablefmt='psql'))
 
     """ 
     ~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -98,54 +110,94 @@ def calculate_EU_contribution(df):
     count_data_origin = df["Count (Data origin)"].sum()
     relative_first_author = df["Distribution (First author)"].sum()
     relative_data_origin = df["Distribution (Data origin)"].sum()
-    print(relative_data_origin)
+    if verbose:
+        print(relative_data_origin)
+        print("EU First author: %.2f (n=%d), EU Data origin: %.2f (n=%d)" % (relative_first_author, count_first_author,  relative_data_origin, count_data_origin))
+
+    results = {"countries": df_countries,
+               "EU": {"First author": {"percent": relative_first_author, "count": count_first_author},
+                      "Data origin": {"percent": relative_data_origin, "count": count_data_origin}}}
 
-    print("EU First author: %.2f (n=%d), EU Data origin: %.2f (n=%d)" % (relative_first_author, count_first_author,  relative_data_origin, count_data_origin))
+    # Bootstrap the articles
+    eu_countries = df["Country"]
+    for name, column in [("First author", "First author"), ("Data origin", "Data origin")]:
+        estimates = bs.bootstrap(df_articles[column].isin(eu_countries).to_numpy(), bs.share, n_resamples, seed, workers)
+        results["EU"][name]["percent_ci"] = bs.confidence_interval(estimates)
+        if verbose:
+            print("EU %s 95%% CI: [%.2f, %.2f]" % ((name,) + results["EU"][name]["percent_ci"]))
 
-#calculate_EU_contribution(df_charting)
+    return results
 
-def additional_statistics_figure_2():
+#calculate_EU_contribution(df_features)
+
+@traced("statistics")
+def additional_statistics_figure_2(df_figure_2, n_resamples=bs.N_RESAMPLES, n_permutations=pt.N_PERMUTATIONS, seed=0, workers=None, verbose=True):
     """
     Prints values to calculate the Data origin
-    per 1000 citable documents for entire regions
+    per 1000 citable documents for entire regions,
+    bootstrap confidence intervals of the means and
+    permutation tests of the differences between regions
+    (df_figure_2 is the data_figure_2 sheet)
     """
-    df = pd.read_excel("data_figures.xlsx", sheet_name="data_figure_2", engine="openpyxl")
+    df = df_figure_2
 
-    print(f"Global: Mean Score: {df['Data origin per 1000 citable documents'].mean():.3f}, Standard Deviation: {df['Data origin per 1000 citable documents'].std():.3f}")
+    scores = df['Data origin per 1000 citable documents']
+    results = {"Global": {"mean": scores.mean(), "std": scores.std()}, "Regions": {}}
+    if verbose:
+        print(f"Global: Mean Score: {scores.mean():.3f}, Standard Deviation: {scores.std():.3f}")
 
     # Group by region and calculate the required statistics
     df_regions = df.groupby('Region (Country)')['Data origin per 1000 citable documents'].agg(['mean', 'std', list])
 
     # Print the results nicely formatted
     for index, row in df_regions.iterrows():
-        print(f"Region: {index}\nMean Score: {row['mean']:.3f}, Standard Deviation: {row['std']:.3f}, Scores List: {row['list']}")
+        if verbose:
+            print(f"Region: {index}\nMean Score: {row['mean']:.3f}, Standard Deviation: {row['std']:.3f}, Scores List: {row['list']}")
+
+        results["Regions"][index] = {"mean": row['mean'], "std": row['std'], "scores": row['list'], "mean_ci": None}
+
+        # Bootstrap the countries of the region ("other" is not a region, a single country has no interval)
+        values = np.array(row['list'], dtype=float)
+        values = values[~np.isnan(values)]
+        if index == 'other' or len(values) < 2:
+            continue
+        estimates = bs.bootstrap(values, bs.mean, n_resamples, seed, workers)
+        results["Regions"][index]["mean_ci"] = bs.confidence_interval(estimates)
+        if verbose:
+            print("Mean Score 95%% CI: [%.3f, %.3f]" % results["Regions"][index]["mean_ci"])
+
+    # Test differences between regions (countries summarized as "other" are not a region)
+    df = df[df['Region (Country)'] != 'other']
+    df_tests = pt.pairwise_permutation_tests(df['Data origin per 1000 citable documents'], df['Region (Country)'], n_permutations, seed)
+    results["Tests"] = df_tests
+    if verbose:
+        print(tabulate(df_tests, headers='keys', tablefmt='psql', showindex=False))
+
+    return results
 
 #additional_statistics_figure_4()
 
-def calculate_first_and_senior_author_overlap(df):
+@traced("statistics")
+def calculate_first_and_senior_author_overlap(df, verbose=True):
     """
     Calculates fraction of articles where
     first and senior author are from same country
     """
-    def filter_same_author_origin(row):
-        first_author_origin = row['First author']
-        senior_author_origin = row['Senior author']
-        return first_author_origin == senior_author_origin or senior_author_origin == ""
-
     # Number of articles
     total_count = len(df.index)
 
-    # Remove records with distinct first and senior author
-    df = df[df.apply(filter_same_author_origin, axis=1)]
-
     # Number of articles with first and senior from same country
-    same_author_origin_count = len(df.index)
+    same_author_origin_count = df["Same author origin"].sum()
+
+    if verbose:
+        print("Articles with same author origin: %.2f (n=%d)" % ((same_author_origin_count * 100 / total_count), same_author_origin_count))
 
-    print("Articles with same author origin: %.2f (n=%d)" % ((same_author_origin_count * 100 / total_count), same_author_origin_count))
+    return {"Same author origin": {"percent": same_author_origin_count * 100 / total_count, "count": same_author_origin_count}}
 
-#calculate_first_and_senior_author_overlap(df_charting)
+#calculate_first_and_senior_author_overlap(df_features)
 
-def author_and_data_origin(df):
+@traced("statistics")
+def author_and_data_origin(df, df_article_origin, verbose=True):
     """
     Calculates:
     1) Number of articles with single data origin
@@ -153,19 +205,11 @@ def author_and_data_origin(df):
     3) Number of different data origins for 1)
     4) Number of articles for which first author and data origin overlap for 1)
     """
-    def filter_only_single_data_origin(row):
-        origin_list = row['Data origin_list']
-        origin = origin_list[0]
-        return len(origin_list) == 1 and origin != "various"
-
-    def filter_domestic_use(row):
-        return row['Data origin'] == row["First author"]
-
     # Total numbers of articles
     total_count = len(df.index)
 
     # Filter single origin only
-    df_single_origin = df[df.apply(filter_only_single_data_origin, axis=1)]
+    df_single_origin = df[df["Single data origin"]]
 
     # Count of articles with single origin
     single_origin_count = len(df_single_origin.index)
@@ -173,149 +217,199 @@ def author_and_data_origin(df):
     # Unique origins:
     first_author_origin, data_origin = df_single_origin["First author"].unique(), df_single_origin["Data origin"].unique()
 
-    print("Articles with single data origin: %.2f (n=%d)" % ((single_origin_count * 100 / total_count), single_origin_count))
-    print("Unique first author origin %d" % len(first_author_origin))
-    print("Unique data origin %d" % len(data_origin))
+    if verbose:
+        print("Articles with single data origin: %.2f (n=%d)" % ((single_origin_count * 100 / total_count), single_origin_count))
+        print("Unique first author origin %d" % len(first_author_origin))
+        print("Unique data origin %d" % len(data_origin))
 
-    # Filter articles where first author and data originate from the same country
-    df_domestic = df_single_origin[df_single_origin.apply(filter_domestic_use, axis=1)]
+    # Count of articles where first author and data originate from the same country
+    same_author_data_origin_count = df_single_origin["Domestic use"].sum()
 
-    # Count of articles with same author and data origin
-    same_author_data_origin_count = len(df_domestic.index)
+    if verbose:
+        print("Articles with same author and data origin: %.2f (n=%d)" % ((same_author_data_origin_count * 100 / single_origin_count), same_author_data_origin_count))
 
-    print("Articles with same author and data origin: %.2f (n=%d)" % ((same_author_data_origin_count * 100 / single_origin_count), same_author_data_origin_count))
-
-    df_multiple_origin = df[~df.apply(filter_only_single_data_origin, axis=1)]
-    first_author_counts = df_multiple_origin['First author'].value_counts().reset_index()
+    df_multiple_origin = df[~df["Single data origin"]]
+    first_author_counts = count_values(df_multiple_origin['First author']).reset_index()
     first_author_counts.columns = ['Country', 'Count (First author)']
 
-    df_multiple_origin = df_multiple_origin.explode("Data origin_list")
-    data_counts = df_multiple_origin['Data origin_list'].value_counts().reset_index()
+    df_multiple_origin = df_article_origin[df_article_origin['PMID'].isin(df_multiple_origin['PMID'])]
+    data_counts = count_values(df_multiple_origin['Data origin']).reset_index()
     data_counts.columns = ['Country', 'Count (Data origin)']
 
     df_multiple_origin_counts = pd.merge(first_author_counts, data_counts, on='Country', how='outer')
 
-    print("Statistics for articles for which first authos and data origin do not overlap:")
-    print(tabulate(df_multiple_origin_counts, headers='keys', tablefmt='psql'))
+    if verbose:
+        print("Statistics for articles for which first authos and data origin do not overlap:")
+        print(tabulate(df_multiple_origin_counts, headers='keys', tablefmt='psql'))
+
+    return {"Single data origin": {"percent": single_origin_count * 100 / total_count, "count": single_origin_count},
+            "Unique first author origins": len(first_author_origin),
+            "Unique data origins": len(data_origin),
+            "Same author and data origin": {"percent": same_author_data_origin_count * 100 / single_origin_count, "count": same_author_data_origin_count},
+            "Multiple data origins": df_multiple_origin_counts}
 
-#author_and_data_origin(df_charting)
+#author_and_data_origin(df_features, df_article_origin)
 
-def authors_per_income_group(df):
+@traced("statistics")
+def authors_per_income_group(df, df_countries, df_citable_documents, n_permutations=pt.N_PERMUTATIONS, seed=0, verbose=True):
     """
     Calculates the number of first authors
-    for each World Bank income group
+    for each World Bank income group and tests
+    the differences in first authors per 1000
+    citable documents between income groups
+    (df_countries and df_citable_documents are
+    the auxiliary tables Country_information
+    and Citable_documents_per_country)
     """
-    auxiliary_data = pd.read_excel("auxiliary_data/Country_information.xlsx", sheet_name='Country_information', skiprows=0)[["Country", "Name (Country)", "World Bank income group"]]
-    df = pd.merge(df, auxiliary_data, left_on='First author', right_on="Country", how='outer')
+    auxiliary_data = df_countries[["Country", "Name (Country)", "World Bank income group"]]
+    first_author_counts = count_values(df['First author']).reset_index()
+    first_author_counts.columns = ['Country', 'Count (First author)']
+    countries = country_index()
+    income_group = countries.lookup(df['First author'], "World Bank income group")
+
+    grouped_data = df['First author'].groupby(income_group).count().reindex(countries.values("World Bank income group"), fill_value=0)
+    if verbose:
+        print(grouped_data)
+
+    # First authors per 1000 citable documents of every country with citable documents
+    citable_documents = df_citable_documents[["Name (Country)", "Citable documents_total"]]
+    df_rates = pd.merge(auxiliary_data, citable_documents, on='Name (Country)')
+    df_rates = pd.merge(df_rates, first_author_counts, on='Country', how='left').fillna({'Count (First author)': 0})
+    df_rates['First author per 1000 citable documents'] = df_rates['Count (First author)'] * 1000 / df_rates['Citable documents_total']
+
+    df_tests = pt.pairwise_permutation_tests(df_rates['First author per 1000 citable documents'], df_rates['World Bank income group'], n_permutations, seed)
+    if verbose:
+        print(tabulate(df_tests, headers='keys', tablefmt='psql', showindex=False))
 
-    grouped_data = df.groupby("World Bank income group").count()['First author']
-    print(grouped_data)
+    return {"First authors": grouped_data, "Tests": df_tests}
 
 #authors_per_income_group(df_charting)
 
-def crossborder_and_domestic_use(df):
+@traced("statistics")
+def crossborder_and_domestic_use(df, verbose=True):
     """
     Calculates number of articles assigned to
     domestic data usage as well as crossborder usage
     """
-    def filter_crossborder_articles(row):
-        origin_list = row['Data origin_list']
-        origin = origin_list[0]
-        return len(origin_list) > 1 or origin == "various" or origin != row["First author"]
-
     # Provide stats on number of articles
-    df_crossborder = df[df.apply(filter_crossborder_articles, axis=1)]
-    df_domestic = df[~df.apply(filter_crossborder_articles, axis=1)]
-    count_crossborder, count_domestic, count_total = len(df_crossborder.index), len(df_domestic.index), len(df.index)
+    count_total = len(df.index)
+    count_crossborder = df["Crossborder"].sum()
+    count_domestic = count_total - count_crossborder
 
-    print(count_total)
-    print("Crossborder articles: %.2f (n=%d); domestic only articles: %.2f (n=%d)" % (count_crossborder *100/count_total, count_crossborder, count_domestic*100/count_total, count_domestic))
+    if verbose:
+        print(count_total)
+        print("Crossborder articles: %.2f (n=%d); domestic only articles: %.2f (n=%d)" % (count_crossborder *100/count_total, count_crossborder, count_domestic*100/count_total, count_domestic))
 
-#crossborder_and_domestic_use(df_charting)
+    return {"Total": count_total,
+            "Crossborder": {"percent": count_crossborder * 100 / count_total, "count": count_crossborder},
+            "Domestic only": {"percent": count_domestic * 100 / count_total, "count": count_domestic}}
 
-def cross_border_flows(df):
+#crossborder_and_domestic_use(df_features)
+
+@traced("statistics")
+def cross_border_flows(df, df_article_origin, verbose=True):
     """
     Calculates crossborder data flows
     """
-    def filter_crossborder_articles(row):
-        return len(row['Data origin_list']) > 1 or row['Data origin_list'][0] != row["First author"] or row['Data origin_list'][0] == "various"
-
-    def filter_various(row):
-        return row['Data origin_list'] != "various"
+    df_crossborder = df[df["Crossborder"]]
 
-    def filter_crossborder_origin(row):
-        return row['Data origin_list'] != row["First author"]
+    # Count the flows from the first author to every specific data origin of the crossborder articles
+    flows = flow_matrix(flow_rows(df_crossborder, df_article_origin))
 
-    df_crossborder = df[df.apply(filter_crossborder_articles, axis=1)]
+    count_flows = flows.off_diagonal().total()
+    if verbose:
+        print("Crossborder flows: %d" % count_flows)
 
-    df_crossborder = df_crossborder.explode('Data origin_list')
-    df_crossborder = df_crossborder[df_crossborder.apply(filter_various, axis=1)]
-    df_crossborder = df_crossborder[df_crossborder.apply(filter_crossborder_origin, axis=1)]
+    return {"Crossborder flows": count_flows}
 
-    print("Crossborder flows: %d" % len(df_crossborder.index))
+#cross_border_flows(df_features, df_article_origin)
 
-#cross_border_flows(df_charting)
-
-def custodian_usage(df):
+@traced("statistics")
+def custodian_usage(df, verbose=True):
     """
     Calculates fractions of article using
     common data sources and provides tables
     to also calculate this per year
     """
-    def filter_used_custodian(row):
-        # Check if any custodian in the row's list is in the common data sources
-        return any(custodian in common_data_sources for custodian in row['Data source_list'])
-
-    # Read external CSV with total number of articles published
-    auxiliary_data = pd.read_excel("auxiliary_data/Data_source_information.xlsx", sheet_name='Data_source_information', skiprows=0, dtype=str)
-    common_data_sources = auxiliary_data["Data source"].unique()
-
-    df_custodian = df[df.apply(filter_used_custodian, axis=1)]
+    # Articles using a data source listed in Data_source_information.xlsx
+    df_custodian = df[df["Common data source"]]
 
     count_custodian = len(df_custodian.index)
     count_total = len(df.index)
 
-    print("Articles using common data source: %.1f (n=%d)" % (count_custodian * 100 / count_total, count_custodian))
+    if verbose:
+        print("Articles using common data source: %.1f (n=%d)" % (count_custodian * 100 / count_total, count_custodian))
+
+    # Number of articles using common data sources and total number of articles per year
+    count_per_year = df.groupby('Publishing year')["Common data source"].agg(['sum', 'size'])
+    count_per_year.columns = ['Count (Common data source)', 'Count (Total)']
 
-    count_source_per_year = df_custodian.groupby('Publishing year').count()
-    count_total_per_year = df.groupby('Publishing year').count()
+    if verbose:
+        print(count_per_year)
 
-    print(count_source_per_year)
-    print(count_total_per_year)
+    return {"Common data source": {"percent": count_custodian * 100 / count_total, "count": count_custodian},
+            "Per year": count_per_year.reset_index()}
 
-#custodian_usage(df_charting)
+#custodian_usage(df_features)
 
-def articles_assigned_to_icd(df):
+@traced("statistics")
+def articles_assigned_to_icd(df, verbose=True):
     """
     Calculates how many articles are assigned to a specific disease
     """
-    def filter_only_assigned_ICD_chapter(row):
-        return row['ICD-10 chapter'] != ""
+    # Number of records assigned to a chapter
+    count_assigned = df["ICD-10 chapter assigned"].sum()
 
-    # Remove records not assigned to a chapter
-    df_filtered = df[df.apply(filter_only_assigned_ICD_chapter, axis=1)]
+    if verbose:
+        print("Paper assigned to an ICD-10 chapter: %.2f (n=%d)" % ((count_assigned/len(df.index)), count_assigned))
 
-    print("Paper assigned to an ICD-10 chapter: %.2f (n=%d)" % ((len(df_filtered.index)/len(df.index)), len(df_filtered.index)))
+    return {"ICD-10 chapter assigned": {"fraction": count_assigned / len(df.index), "count": count_assigned}}
 
-#articles_assigned_to_icd(df_charting)
+#articles_assigned_to_icd(df_features)
 
-def source_usage_for_specific_disease(df, disease, source):
+@traced("statistics")
+def source_usage_for_specific_disease(df, df_article_source, disease, source, verbose=True):
     """
     Calculates how many articles resarching
     a given disease use data from a given source
     """
-    def filter_source(row):
-        # Check if any source in the row's list is in the common data sources
-        return source in  row['Data source_list']
+    # Number of articles per data source and ICD-10 chapter
+    source_icd = source_icd_matrix(source_icd_rows(df, df_article_source).drop_duplicates(['PMID', 'Data source']))
 
-    df = df[df["ICD-10 chapter"] == disease]
-    count_total = len(df.index)
+    count_total = (df["ICD-10 chapter"] == disease).sum()
+    count_filtered = source_icd.pair_counts([source], [disease]).iloc[0]
+
+    if verbose:
+        print("Articles on chapter %s using %s: %.1f (n=%d(/%d))" % (disease, source, count_filtered * 100 / count_total, count_filtered, count_total))
 
-    df = df[df.apply(filter_source, axis=1)]
-    count_filtered = len(df.index)
+    return {"ICD-10 chapter": disease, "Data source": source,
+            "percent": count_filtered * 100 / count_total, "count": count_filtered, "total": count_total}
 
-    print("Articles on chapter %s using %s: %.1f (n=%d(/%d))" % (disease, source, count_filtered * 100 / count_total, count_filtered, count_total))
+#source_usage_for_specific_disease(df_charting, df_article_source, "2", "Flatiron Health")
+#source_usage_for_specific_disease(df_charting, df_article_source, "4", "Optum")
+#source_usage_for_specific_disease(df_charting, df_article_source, "5", "South London and Maudsley NHS Foundation Trust")
 
-#source_usage_for_specific_disease(df_charting, "2", "Flatiron Health")
-#source_usage_for_specific_disease(df_charting, "4", "Optum")
-#source_usage_for_specific_disease(df_charting, "5", "South London and Maudsley NHS Foundation Trust")
\ No newline at end of file
+@traced("statistics")
+def statistics_report(session=None):
+    """
+    Prints all statistics with the tables of session
+    (default: the shared session), the article
+    features are only computed once
+    """
+    session = session or get_session()
+
+    session.run(additional_statistics_figure_1)
+    session.run(calculate_EU_contribution)
+    session.run(additional_statistics_figure_2)
+    session.run(calculate_first_and_senior_author_overlap)
+    session.run(author_and_data_origin)
+    session.run(authors_per_income_group)
+    session.run(crossborder_and_domestic_use)
+    session.run(cross_border_flows)
+    session.run(custodian_usage)
+    session.run(articles_assigned_to_icd)
+    session.run(source_usage_for_specific_disease, disease="2", source="Flatiron Health")
+    session.run(source_usage_for_specific_disease, disease="4", source="Optum")
+    session.run(source_usage_for_specific_disease, disease="5", source="South London and Maudsley NHS Foundation Trust")
+
+#statistics_report()
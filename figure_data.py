@@ -0,0 +1,55 @@
+import os
+import pandas as pd
+from auxiliary_tables import parquet_available
+from instrumentation import traced
+
+FIGURE_DATA_FILE = "data_figures.xlsx"
+SIDECAR_DIR = "figure_data"
+
+@traced("figure_data")
+def write_figure_data(frames, file=FIGURE_DATA_FILE, sidecar_dir=SIDECAR_DIR):
+    """
+    Writes all figure frames (sheet name -> DataFrame) in a
+    single pass to the workbook using openpyxl's write-only
+    mode and stores a Parquet sidecar per sheet
+    """
+    # openpyxl is only imported when writing, reading mostly uses the sidecars
+    from openpyxl import Workbook
+
+    # Stream all sheets into a fresh workbook
+    workbook = Workbook(write_only=True)
+    for sheet_name, df in frames.items():
+        worksheet = workbook.create_sheet(sheet_name)
+        worksheet.append([_header_cell(worksheet, column) for column in df.columns])
+        for row in df.itertuples(index=False, name=None):
+            worksheet.append([None if pd.isna(value) else value for value in row])
+    workbook.save(file)
+
+    # Sidecars are written after the workbook so they are never older than it
+    if parquet_available():
+        os.makedirs(sidecar_dir, exist_ok=True)
+        for sheet_name, df in frames.items():
+            df.to_parquet(os.path.join(sidecar_dir, f"{sheet_name}.parquet"), index=False)
+
+@traced("figure_data")
+def read_figure_data(sheet_name, file=FIGURE_DATA_FILE, sidecar_dir=SIDECAR_DIR):
+    """
+    Reads a figure sheet from its Parquet sidecar and falls back
+    to the workbook if the sidecar is missing or older than it
+    """
+    sidecar = os.path.join(sidecar_dir, f"{sheet_name}.parquet")
+    if parquet_available() and os.path.exists(sidecar) and os.path.getmtime(sidecar) >= os.path.getmtime(file):
+        return pd.read_parquet(sidecar)
+    return pd.read_excel(file, sheet_name=sheet_name, engine="openpyxl")
+
+def _header_cell(worksheet, value):
+    # Same header style as pandas' to_excel
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+
+    cell = WriteOnlyCell(worksheet, value=value)
+    side = Side(style="thin")
+    cell.font = Font(bold=True)
+    cell.border = Border(left=side, right=side, top=side, bottom=side)
+    cell.alignment = Alignment(horizontal="center", vertical="top")
+    return cell
@@ -0,0 +1,88 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import matplotlib as mpl
+import pandas as pd
+from instrumentation import traced
+
+OUTPUT_DIR = "figure_output"
+# One file per figure, so figures rendered in parallel do not race
+RENDER_CACHE_DIR = os.path.join(OUTPUT_DIR, ".render_cache")
+
+# Exported formats as (format, dpi), dpi None uses the matplotlib default
+EXPORT_FORMATS = [("svg", None), ("png", None)]
+
+# Files exported by the plot function currently running under cached_render
+_exported_files = []
+
+@traced("plot")
+def export_figure(fig, name, formats=EXPORT_FORMATS, output_dir=OUTPUT_DIR):
+    """
+    Lays out the figure once, computes the tight bounding box
+    once and writes the figure in all requested formats and DPIs
+    """
+    fig.draw_without_rendering()
+    bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(mpl.rcParams["savefig.pad_inches"])
+
+    for file_format, dpi in formats:
+        suffix = "" if dpi is None else f"_{dpi}dpi"
+        file = os.path.join(output_dir, f"{name}{suffix}.{file_format}")
+        fig.savefig(file, format=file_format, dpi="figure" if dpi is None else dpi, bbox_inches=bbox)
+        _exported_files.append(file)
+
+def cached_render(name, helpers=()):
+    """
+    Decorator skipping a plot function if a hash of its input
+    frames and parameters (and of its source code, the source of
+    the modules of the helpers it draws with and the export
+    formats) matches the last export and all files still exist.
+    Figures shown interactively (show=True) are always rendered.
+
+    The decorated function returns False if rendering was skipped
+    """
+    def decorator(plot_function):
+        @functools.wraps(plot_function)
+        def wrapper(*args, show=True, **kwargs):
+            key = _render_key(plot_function, helpers, args, kwargs)
+            entry = _load_render_cache(name)
+
+            if not show and entry is not None and entry["key"] == key and all(os.path.exists(file) for file in entry["files"]):
+                return False
+
+            _exported_files.clear()
+            plot_function(*args, show=show, **kwargs)
+            _save_render_cache(name, {"key": key, "files": list(_exported_files)})
+            return True
+
+        return wrapper
+
+    return decorator
+
+def _render_key(plot_function, helpers, args, kwargs):
+    sha = hashlib.sha256()
+    sha.update(inspect.getsource(plot_function).encode())
+    for helper in helpers:
+        sha.update(inspect.getsource(inspect.getmodule(helper)).encode())
+    sha.update(repr(EXPORT_FORMATS).encode())
+    for value in list(args) + [kwargs[key] for key in sorted(kwargs)]:
+        if isinstance(value, pd.DataFrame):
+            sha.update(repr((list(value.columns), [str(dtype) for dtype in value.dtypes])).encode())
+            sha.update(pd.util.hash_pandas_object(value, index=True).values.tobytes())
+        else:
+            sha.update(repr(value).encode())
+    sha.update(repr(sorted(kwargs)).encode())
+    return sha.hexdigest()
+
+def _load_render_cache(name):
+    file = os.path.join(RENDER_CACHE_DIR, f"{name}.json")
+    if os.path.exists(file):
+        with open(file) as f:
+            return json.load(f)
+    return None
+
+def _save_render_cache(name, entry):
+    os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+    with open(os.path.join(RENDER_CACHE_DIR, f"{name}.json"), "w") as f:
+        json.dump(entry, f, indent=2)
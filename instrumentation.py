@@ -0,0 +1,167 @@
+"""
+Opt-in instrumentation of the loader, the preprocessing, the
+statistics and the plot functions
+
+Tracing is off unless enabled with enable_tracing() or the environment
+variable TRACE_FILE. Every traced call records wall time, CPU time,
+rows in and out (lengths of DataFrame/Series arguments and results)
+and, with TRACE_MEMORY=1, the peak memory traced by tracemalloc.
+tracemalloc has one peak per process, which every span resets. Nested
+spans of one thread carry the peak over to the enclosing span, but
+spans of threads running at the same time (e.g. in the threaded query
+service) reset each other's peaks, so peak memory is only valid if one
+thread is traced at a time.
+Records are appended to the trace file as JSON lines as soon as a call
+finishes, so processes running in parallel (e.g. render_figures.py)
+can share one trace file. The trace can be converted to a Chrome trace
+(chrome://tracing, Perfetto) with write_chrome_trace(), which is done
+on exit if CHROME_TRACE_FILE is set.
+"""
+import argparse
+import atexit
+import contextlib
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import pandas as pd
+
+# Tracing settings, see enable_tracing()
+_settings = {"file": None, "memory": False}
+
+# Open spans of the current thread: [name, peak memory of nested spans]
+_local = threading.local()
+
+def enable_tracing(file, memory=False, chrome_file=None):
+    """
+    Appends a record of every traced call to file (JSON lines),
+    with memory=True also the peak memory of the call (only
+    valid if one thread is traced at a time). If a
+    chrome_file is given, the trace is written as a Chrome trace
+    on exit
+    """
+    _settings["file"] = file
+    _settings["memory"] = memory
+    if memory and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if chrome_file:
+        atexit.register(write_chrome_trace, file, chrome_file)
+
+def tracing_enabled():
+    return _settings["file"] is not None
+
+def traced(category):
+    """
+    Decorator tracing every call of the function (if tracing is enabled)
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not tracing_enabled():
+                return function(*args, **kwargs)
+
+            with trace_span(function.__name__, category, rows_in=_rows(list(args) + list(kwargs.values()))) as span:
+                result = function(*args, **kwargs)
+                span["rows_out"] = _rows(result)
+            return result
+
+        return wrapper
+
+    return decorator
+
+@contextlib.contextmanager
+def trace_span(name, category, **details):
+    """
+    Traces a block of code (if tracing is enabled), values
+    set in the yielded dict are added to the record
+    """
+    if not tracing_enabled():
+        yield {}
+        return
+
+    stack = _stack()
+    parent = stack[-1]["name"] if stack else None
+    if _settings["memory"]:
+        # Keep the peak so far for the enclosing span and start a new one
+        if stack:
+            stack[-1]["peak"] = max(stack[-1]["peak"], tracemalloc.get_traced_memory()[1])
+        memory_start = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    stack.append({"name": name, "peak": 0})
+
+    record = dict(details)
+    start, cpu_start = time.time(), time.process_time()
+    try:
+        yield record
+    finally:
+        wall, cpu = time.time() - start, time.process_time() - cpu_start
+        nested_peak = stack.pop()["peak"]
+        if _settings["memory"]:
+            peak = max(nested_peak, tracemalloc.get_traced_memory()[1])
+            record["peak_memory_mib"] = max(0, peak - memory_start) / 2 ** 20
+            if stack:
+                stack[-1]["peak"] = max(stack[-1]["peak"], peak)
+
+        record.update({"name": name, "category": category, "parent": parent, "start": start,
+                       "wall_seconds": wall, "cpu_seconds": cpu, "pid": os.getpid(), "tid": threading.get_ident()})
+        _append(record)
+
+def read_trace(file):
+    """
+    Returns the records of a trace file
+    """
+    with open(file) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def write_chrome_trace(file, chrome_file):
+    """
+    Converts a trace file into the Chrome trace event format
+    """
+    events = []
+    for record in read_trace(file):
+        args = {key: value for key, value in record.items() if key not in ("name", "category", "start", "wall_seconds", "pid", "tid")}
+        events.append({"name": record["name"], "cat": record["category"], "ph": "X",
+                       "ts": record["start"] * 1e6, "dur": record["wall_seconds"] * 1e6,
+                       "pid": record["pid"], "tid": record["tid"], "args": args})
+
+    with open(chrome_file, "w") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+def _rows(value):
+    # Rows of all DataFrames and Series in value (None if there are none)
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        return len(value.index)
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        counts = [rows for rows in map(_rows, value) if rows is not None]
+        return sum(counts) if counts else None
+    return None
+
+def _append(record):
+    # A single write per record, so records of parallel processes do not interleave
+    with open(_settings["file"], "a") as f:
+        f.write(json.dumps(record, default=str) + "\n")
+
+if os.environ.get("TRACE_FILE"):
+    enable_tracing(os.environ["TRACE_FILE"], os.environ.get("TRACE_MEMORY") == "1", os.environ.get("CHROME_TRACE_FILE"))
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Summarize a trace file and convert it to a Chrome trace")
+    parser.add_argument("trace", help="trace file (JSON lines)")
+    parser.add_argument("--chrome", help="Chrome trace file to write")
+    args = parser.parse_args()
+
+    df = pd.DataFrame(read_trace(args.trace))
+    summary = df.groupby(["category", "name"]).agg(calls=("wall_seconds", "size"), wall_seconds=("wall_seconds", "sum"), cpu_seconds=("cpu_seconds", "sum"))
+    print(summary.sort_values("wall_seconds", ascending=False).to_string())
+
+    if args.chrome:
+        write_chrome_trace(args.trace, args.chrome)
@@ -0,0 +1,67 @@
+"""
+Batched two-sample permutation tests
+
+Group labels are permuted in blocks (one row of the label matrix per
+permutation) and the difference in means is evaluated for the whole
+block with a single matrix product. Permuting stops early as soon as
+the p-value is resolved, i.e. the Monte Carlo error can no longer
+change whether it is below the significance level.
+"""
+import itertools
+import numpy as np
+import pandas as pd
+
+N_PERMUTATIONS = 100000
+BLOCK_SIZE = 2000
+ALPHA = 0.05
+
+# Standard normal quantile of the Monte Carlo error bound used for early stopping (99.9%)
+STOPPING_Z = 3.29
+
+def permutation_test(values_a, values_b, n_permutations=N_PERMUTATIONS, seed=0, block_size=BLOCK_SIZE, alpha=ALPHA):
+    """
+    Two-sided permutation test of the difference in means of
+    two samples. Returns the observed difference, the p-value
+    and the number of permutations evaluated
+    """
+    values = np.concatenate([values_a, values_b]).astype(float)
+    labels = np.concatenate([np.ones(len(values_a)), np.zeros(len(values_b))])
+    observed = abs(_mean_difference(labels[np.newaxis, :], values, len(values_a))[0])
+
+    rng = np.random.default_rng(seed)
+    exceeding, evaluated = 0, 0
+    while evaluated < n_permutations:
+        size = min(block_size, n_permutations - evaluated)
+        permuted = rng.permuted(np.tile(labels, (size, 1)), axis=1)
+        exceeding += np.count_nonzero(np.abs(_mean_difference(permuted, values, len(values_a))) >= observed - 1e-12)
+        evaluated += size
+
+        # Stop once the p-value is clearly above or below alpha
+        p_value = (exceeding + 1) / (evaluated + 1)
+        if abs(p_value - alpha) > STOPPING_Z * np.sqrt(p_value * (1 - p_value) / evaluated):
+            break
+
+    return observed, (exceeding + 1) / (evaluated + 1), evaluated
+
+def pairwise_permutation_tests(values, groups, n_permutations=N_PERMUTATIONS, seed=0, block_size=BLOCK_SIZE, alpha=ALPHA):
+    """
+    Permutation tests for all pairs of groups, returns one
+    row per pair of groups (groups with a single value are
+    skipped)
+    """
+    values = pd.Series(np.asarray(values, dtype=float), index=pd.Index(groups))
+    values = values[~np.isnan(values.to_numpy())]
+    samples = {group: sample.to_numpy() for group, sample in values.groupby(level=0, sort=True) if len(sample) > 1}
+
+    rows = []
+    for group_a, group_b in itertools.combinations(samples, 2):
+        difference, p_value, evaluated = permutation_test(samples[group_a], samples[group_b], n_permutations, seed, block_size, alpha)
+        rows.append({"Group A": group_a, "Group B": group_b, "Mean A": samples[group_a].mean(), "Mean B": samples[group_b].mean(),
+                     "Difference": difference, "p-value": p_value, "Permutations": evaluated})
+
+    return pd.DataFrame(rows, columns=["Group A", "Group B", "Mean A", "Mean B", "Difference", "p-value", "Permutations"])
+
+def _mean_difference(labels, values, count_a):
+    # labels holds one permutation per row, 1 for group a and 0 for group b
+    sum_a = labels @ values
+    return sum_a / count_a - (values.sum() - sum_a) / (len(values) - count_a)
@@ -0,0 +1,235 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+import types
+from auxiliary_tables import file_sha256
+from figure_data import SIDECAR_DIR, read_figure_data, write_figure_data
+
+MANIFEST_FILE = os.path.join(SIDECAR_DIR, "pipeline_manifest.json")
+
+# Modules in this directory are code dependencies of the stages
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+class Stage:
+    """
+    A preprocessing stage of the pipeline
+
+    func is called with the products named in inputs (in that
+    order) and params as keyword arguments. It returns the values
+    for outputs (in-memory products) followed by the values for
+    sheets (figure sheets), a single value is returned as is.
+    Files written by func are declared as targets, files read
+    by func (other than through inputs) are declared as files.
+    """
+    def __init__(self, name, func, inputs=(), files=(), params=None, outputs=(), sheets=(), targets=()):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.files = list(files)
+        self.params = dict(params or {})
+        self.outputs = list(outputs)
+        self.sheets = list(sheets)
+        self.targets = list(targets)
+
+    def persistent(self):
+        return len(self.sheets) > 0 or len(self.targets) > 0
+
+def run_pipeline(stages, force=False):
+    """
+    Runs all stages whose fingerprint (source code of the stage and
+    of the code it calls, parameters, content hashes of the input files and fingerprints
+    of upstream stages) changed since the last run. Sheets of
+    unchanged stages are taken from the previous output and the
+    workbook is only rewritten if at least one sheet changed.
+
+    Returns all figure frames (sheet name -> DataFrame)
+    """
+    manifest = _load_manifest()
+    producers = {product: stage for stage in stages for product in stage.outputs + stage.sheets}
+    file_producers = {target: stage for stage in stages for target in stage.targets}
+
+    products = {}
+    fingerprints = {}
+    recomputed = []
+
+    def run_stage(stage):
+        args = [resolve(product) for product in stage.inputs]
+        result = stage.func(*args, **stage.params)
+        names = stage.outputs + stage.sheets
+        if len(names) == 1:
+            result = (result,)
+        for name, value in zip(names, result or ()):
+            products[name] = value
+        recomputed.append(stage.name)
+
+    def resolve(product):
+        # In-memory products are only computed once a stage needs them
+        if product not in products:
+            run_stage(producers[product])
+        return products[product]
+
+    for stage in _topological_order(stages, producers, file_producers):
+        fingerprint = _fingerprint(stage, manifest, fingerprints, producers, file_producers)
+        fingerprints[stage.name] = fingerprint
+        if not stage.persistent():
+            continue
+
+        recorded = manifest["stages"].get(stage.name)
+        targets_exist = all(os.path.exists(target) for target in stage.targets)
+
+        # Adopt existing targets of a stage never run by the pipeline
+        # (e.g. files committed to the repository) instead of overwriting them
+        if not force and recorded is None and not stage.sheets and targets_exist:
+            continue
+
+        if not force and recorded == fingerprint and targets_exist and _load_previous_sheets(stage, products):
+            continue
+
+        run_stage(stage)
+
+    # Refresh the hashes of files written by the stages
+    for stage in stages:
+        for target in stage.targets:
+            if os.path.exists(target):
+                _file_hash(target, manifest)
+
+    frames = {sheet: products[sheet] for stage in stages for sheet in stage.sheets}
+    if any(stage.sheets for stage in stages if stage.name in recomputed):
+        write_figure_data(frames)
+
+    manifest["stages"] = {stage.name: fingerprints[stage.name] for stage in stages}
+    _save_manifest(manifest)
+
+    print("Recomputed stages: %s" % (", ".join(recomputed) if recomputed else "none"))
+    return frames
+
+def _fingerprint(stage, manifest, fingerprints, producers, file_producers):
+    upstream = {product: fingerprints[producers[product].name] for product in stage.inputs}
+    upstream.update({file: fingerprints[file_producers[file].name] for file in stage.files if file in file_producers})
+
+    content = {
+        "name": stage.name,
+        "source": _code_sources(stage.func),
+        "params": {key: repr(value) for key, value in sorted(stage.params.items())},
+        "files": {file: _file_hash(file, manifest) for file in stage.files},
+        "upstream": upstream,
+    }
+    return hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()
+
+def _code_sources(func):
+    """
+    Source code a stage function depends on: the function and the
+    functions of its module it calls (transitively), the constants
+    they use and the complete source of every module of this
+    directory they use (including the modules those import)
+    """
+    func = inspect.unwrap(func)
+    module = sys.modules[func.__module__]
+    sources = {}
+    modules = set()
+    pending = [func]
+
+    while pending:
+        function = inspect.unwrap(pending.pop())
+        key = _source_key(sys.modules[function.__module__], function.__qualname__)
+        if key in sources:
+            continue
+        sources[key] = inspect.getsource(function)
+
+        for name in _referenced_names(function.__code__):
+            value = function.__globals__.get(name)
+            value_module = inspect.getmodule(value) if value is not None else None
+            if isinstance(value, types.FunctionType) and value_module is module:
+                pending.append(value)
+            elif _is_local_module(value_module):
+                if value_module is not module:
+                    modules.add(value_module)
+            elif isinstance(value, (str, int, float, list, tuple, dict)):
+                sources[_source_key(module, name)] = repr(value)
+
+    for dependency in _module_dependencies(modules):
+        sources[_source_key(dependency)] = inspect.getsource(dependency)
+    return sources
+
+def _source_key(module, name=None):
+    # Keyed by file, a module run as script is named __main__ instead of its file name
+    file = os.path.relpath(os.path.abspath(module.__file__), CODE_DIR)
+    return file if name is None else "%s:%s" % (file, name)
+
+def _referenced_names(code):
+    # Global names used by a function, including nested lambdas and comprehensions
+    names = set(code.co_names)
+    for constant in code.co_consts:
+        if isinstance(constant, types.CodeType):
+            names |= _referenced_names(constant)
+    return names
+
+def _is_local_module(module):
+    file = getattr(module, "__file__", None)
+    return file is not None and os.path.dirname(os.path.abspath(file)) == CODE_DIR
+
+def _module_dependencies(modules):
+    # The modules and all modules of this directory they import (transitively)
+    found = {}
+    pending = list(modules)
+    while pending:
+        module = pending.pop()
+        if _source_key(module) in found:
+            continue
+        found[_source_key(module)] = module
+        for value in vars(module).values():
+            value_module = value if isinstance(value, types.ModuleType) else inspect.getmodule(value)
+            if _is_local_module(value_module):
+                pending.append(value_module)
+    return [found[name] for name in sorted(found)]
+
+def _file_hash(file, manifest):
+    # Re-hash a file only if its modification time or size changed
+    stat = os.stat(file)
+    known = manifest["files"].get(file)
+    if known is None or known["mtime_ns"] != stat.st_mtime_ns or known["size"] != stat.st_size:
+        known = {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "sha256": file_sha256(file)}
+        manifest["files"][file] = known
+    return known["sha256"]
+
+def _load_previous_sheets(stage, products):
+    try:
+        for sheet in stage.sheets:
+            products[sheet] = read_figure_data(sheet)
+    except (FileNotFoundError, KeyError, ValueError):
+        return False
+    return True
+
+def _topological_order(stages, producers, file_producers):
+    order = []
+    visited = set()
+
+    def visit(stage, path):
+        if stage.name in path:
+            raise ValueError("Cyclic dependency between stages: %s" % " -> ".join(path + [stage.name]))
+        if stage.name in visited:
+            return
+        for product in stage.inputs:
+            visit(producers[product], path + [stage.name])
+        for file in stage.files:
+            if file in file_producers:
+                visit(file_producers[file], path + [stage.name])
+        visited.add(stage.name)
+        order.append(stage)
+
+    for stage in stages:
+        visit(stage, [])
+    return order
+
+def _load_manifest():
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE) as f:
+            return json.load(f)
+    return {"stages": {}, "files": {}}
+
+def _save_manifest(manifest):
+    os.makedirs(os.path.dirname(MANIFEST_FILE), exist_ok=True)
+    with open(MANIFEST_FILE, "w") as f:
+        json.dump(manifest, f, indent=2)
@@ -1,20 +1,17 @@
-import matplotlib as mpl
 import matplotlib.pyplot as plt
 import seaborn as sns
-import pandas as pd
 import numpy as np
+from bar_charts import apply_style, bar_labels, bars
+from figure_data import read_figure_data
+from figure_export import cached_render, export_figure
+from instrumentation import traced
 
 plt.rcParams['svg.fonttype'] = 'none'
-mpl.style.use("ggplot")
-COLOR = 'black'
-mpl.rcParams['text.color'] = COLOR
-mpl.rcParams['axes.labelcolor'] = COLOR
-mpl.rcParams['xtick.color'] = COLOR
-mpl.rcParams['ytick.color'] = COLOR
+apply_style()
 
-df = pd.read_excel("data_figures.xlsx", sheet_name="data_figure_1", engine="openpyxl")
-
-def plot_figure_1(df):
+@traced("plot")
+@cached_render("figure_1", helpers=[bars])
+def plot_figure_1(df, show=True):
 
     # Set font sizes
     font_size_label = 10
@@ -29,14 +26,15 @@ def plot_figure_1(df):
     # Plotting
     fig, ax = plt.subplots(figsize=(4.5, 2.5))
     cmap = plt.get_cmap("Pastel2")
-    bars_non_covid = ax.bar(years_index, df["Normalized (Non-COVID-19-related)"], label='Non-COVID-19-related', color=cmap.colors[0], width=0.4, edgecolor="black", linewidth=1)
-    bars_covid = ax.bar(years_index, df["Normalized (COVID-19-related)"], bottom=df["Normalized (Non-COVID-19-related)"], label='COVID-19-related', color=cmap.colors[1], width=0.4, edgecolor="black", linewidth=1)
+    bars_non_covid = bars(ax, years_index, df["Normalized (Non-COVID-19-related)"], cmap.colors[0], label='Non-COVID-19-related')
+    bars_covid = bars(ax, years_index, df["Normalized (COVID-19-related)"], cmap.colors[1], bottom=df["Normalized (Non-COVID-19-related)"], label='COVID-19-related')
 
     # Adding text above the stacked bars
     total_heights = df["Normalized (Non-COVID-19-related)"] + df["Normalized (COVID-19-related)"] + distance_bar_label
-    for idx, rect in enumerate(bars_non_covid):
-        ax.text(rect.get_x() + rect.get_width() / 2.0, total_heights[idx], str(df["Count (Total)"][idx]),
-                ha='center', va='bottom', fontsize=font_size_text)
+    bar_labels(ax, years_index, total_heights, df["Count (Total)"].astype(str), fontsize=font_size_text)
+
+    # Collections of the regression CIs follow the bars
+    first_ci = len(ax.collections)
 
     # Draw regression
     sns.regplot(x=years_index, y=df["Normalized (COVID-19-related)"] + df["Normalized (Non-COVID-19-related)"], scatter=False, line_kws={"color": "gray"})
@@ -53,16 +51,17 @@ def plot_figure_1(df):
     ax.set_yticks(np.arange(0, 14.1, 2), np.arange(0, 14.1, 2).astype(int), fontsize=font_size_ticks)
 
     # Make CI areas less transparent
-    plt.setp(ax.collections[0], alpha=0.25)
-    plt.setp(ax.collections[1], alpha=0.4)
+    plt.setp(ax.collections[first_ci], alpha=0.25)
+    plt.setp(ax.collections[first_ci + 1], alpha=0.4)
 
     # Legend
     plt.legend(handles=[bars_non_covid, bars_covid], labels=['Other focus', 'COVID-19 related'], bbox_to_anchor=(0.5, 1.25), loc='upper center', ncol=2, fontsize=font_size_legend)
 
-    plt.savefig("figure_output/figure_1.svg", bbox_inches='tight')
-    plt.savefig("figure_output/figure_1.png", bbox_inches='tight')
-    plt.show()
+    export_figure(fig, "figure_1")
+    if show:
+        plt.show()
     plt.close()
 
-plot_figure_1(df)
-
+if __name__ == "__main__":
+    df = read_figure_data("data_figure_1")
+    plot_figure_1(df)
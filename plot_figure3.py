@@ -1,21 +1,17 @@
-import matplotlib as mpl
 import matplotlib.pyplot as plt
-import pandas as pd
 import numpy as np
-from pysankey2 import Sankey
+from bar_charts import apply_style, bar_labels, bars
+from figure_data import read_figure_data
+from figure_export import cached_render, export_figure
+from instrumentation import traced
+from sankey import plot_sankey, weighted_flows
 
 plt.rcParams['svg.fonttype'] = 'none'
-mpl.style.use("ggplot")
-COLOR = 'black'
-mpl.rcParams['text.color'] = COLOR
-mpl.rcParams['axes.labelcolor'] = COLOR
-mpl.rcParams['xtick.color'] = COLOR
-mpl.rcParams['ytick.color'] = COLOR
+apply_style()
 
-df_counts = pd.read_excel("data_figures.xlsx", sheet_name="data_figure_3a", engine="openpyxl")
-df_flows = pd.read_excel("data_figures.xlsx", sheet_name="data_figure_3b", engine="openpyxl")
-
-def plot_figure_3a(df):
+@traced("plot")
+@cached_render("figure_3a", helpers=[bars])
+def plot_figure_3a(df, show=True):
 
     # Set font sizes
     font_size_label = 10
@@ -31,17 +27,12 @@ def plot_figure_3a(df):
     x = np.arange(len(df["Name (Country)"])) # the label locations
     width = 0.35  # the width of the bars
 
-    bars_crossborder = ax.bar(x - width/2 -0.03, df["Distribution (Data origin crossborder)"], width, color='#B3E2CD', edgecolor="black", linewidth=1)
-    bars_domestic = ax.bar(x + width/2 +0.03, df["Distribution (Data origin domestic)"], width, color='#FDCDAC', edgecolor="black", linewidth=1)
+    bars_crossborder = bars(ax, x - width/2 -0.03, df["Distribution (Data origin crossborder)"], '#B3E2CD', width)
+    bars_domestic = bars(ax, x + width/2 +0.03, df["Distribution (Data origin domestic)"], '#FDCDAC', width)
 
     # Adding value labels to each bar
-    for idx, rect in enumerate(bars_crossborder):
-        ax.text(rect.get_x() + rect.get_width() / 2.0, df["Distribution (Data origin crossborder)"][idx] + distance_bar_label, str(df["Count (Data origin crossborder)"][idx]),
-                ha='center', va='bottom', fontsize=font_size_bar_label)
-
-    for idx, rect in enumerate(bars_domestic):
-        ax.text(rect.get_x() + rect.get_width() / 2.0, df["Distribution (Data origin domestic)"][idx] + distance_bar_label, str(df["Count (Data origin domestic)"][idx]),
-                ha='center', va='bottom', fontsize=font_size_bar_label)
+    bar_labels(ax, x - width/2 -0.03, df["Distribution (Data origin crossborder)"] + distance_bar_label, df["Count (Data origin crossborder)"].astype(str), fontsize=font_size_bar_label)
+    bar_labels(ax, x + width/2 +0.03, df["Distribution (Data origin domestic)"] + distance_bar_label, df["Count (Data origin domestic)"].astype(str), fontsize=font_size_bar_label)
 
     # Grid
     ax.grid(axis='x')
@@ -59,17 +50,18 @@ def plot_figure_3a(df):
     fig.tight_layout()
 
     plt.legend(handles=[bars_crossborder,  bars_domestic], labels=['Cross-border sharing', 'Domestic usage'], loc='lower center', ncols = 2, bbox_to_anchor=(0.5, 1), fontsize=font_size_legend)
-    plt.savefig("figure_output/figure_3a.svg", bbox_inches='tight')
-    plt.savefig("figure_output/figure_3a.png", bbox_inches='tight')
-    plt.show()
+    export_figure(fig, "figure_3a")
+    if show:
+        plt.show()
     plt.close()
 
 
-def plot_figure_3b(df):
+@traced("plot")
+@cached_render("figure_3b", helpers=[plot_sankey])
+def plot_figure_3b(df, show=True):
 
-    # Remove columns not required and rename to "layer1" and "layer2"
-    df = df[["Name (Country data origin)", "Name (Country first author)"]]
-    df.rename(columns={"Name (Country data origin)":"layer1", "Name (Country first author)": "layer2"}, inplace=True)
+    # Aggregate identical data origin -> first author pairs into weighted flows
+    flows = weighted_flows(df, "Name (Country data origin)", "Name (Country first author)")
 
     # Assign colors
     cmap = plt.get_cmap("Pastel2")
@@ -95,23 +87,21 @@ def plot_figure_3b(df):
                     'layer2':["United States", "United Kingdom",  "Netherlands",  "Japan", "Germany", "Canada", "Switzerland"]}
 
     # Plot sankey
-    sky = Sankey(df,layerLabels = layer_labels,colorDict=color_dict,colorMode="layer", stripColor='left', )
-    fig, ax = sky.plot(figSize=(5.5, 3), fontSize=10, boxInterv=0.05, boxWidth=0.5, stripLen=7)
-
-    # Add label for "axes"
-    ax.text(0, 47, 'Data origin', weight='bold', fontsize=10, ha="left", va="bottom")
-    ax.text(8, 47, 'First author', weight='bold', fontsize=10, ha="right", va="bottom")
+    fig, ax = plot_sankey(flows, layer_labels, color_dict, layer_titles=("Data origin", "First author"),
+                          fig_size=(5.5, 3), font_size=10, box_interval=0.05, box_width=0.5, strip_len=7)
 
     # Add title for subfigure
     ax.set_title("B\n", loc="left")
 
     # Plot and save
     fig.tight_layout()
-    plt.savefig("figure_output/figure_3b.svg", bbox_inches='tight')
-    plt.savefig("figure_output/figure_3b.png", bbox_inches='tight')
-    plt.show()
+    export_figure(fig, "figure_3b")
+    if show:
+        plt.show()
     plt.close()
-    plt.show()
 
-plot_figure_3a(df_counts)
-plot_figure_3b(df_flows)
\ No newline at end of file
+if __name__ == "__main__":
+    df_counts = read_figure_data("data_figure_3a")
+    df_flows = read_figure_data("data_figure_3b")
+    plot_figure_3a(df_counts)
+    plot_figure_3b(df_flows)
@@ -1,19 +1,15 @@
-import matplotlib as mpl
 import matplotlib.pyplot as plt
-import pandas as pd
-from matplotlib.patches import Patch
 import numpy as np
+from bar_charts import apply_style, bars, legend_patches
+from figure_data import read_figure_data
+from figure_export import cached_render, export_figure
+from instrumentation import traced
 
-mpl.style.use("ggplot")
-COLOR = 'black'
-mpl.rcParams['text.color'] = COLOR
-mpl.rcParams['axes.labelcolor'] = COLOR
-mpl.rcParams['xtick.color'] = COLOR
-mpl.rcParams['ytick.color'] = COLOR
+apply_style()
 
-df = pd.read_excel("data_figures.xlsx", sheet_name="data_figure_4", engine="openpyxl")
-
-def plot_figure_4(df):
+@traced("plot")
+@cached_render("figure_4", helpers=[bars])
+def plot_figure_4(df, show=True):
 
     # Setting colors for each country with the specified colors
     colors = df["Origin (Data source)"].map({"United States": "#ADDBC7", "United Kingdom": "#FDCDAC", "Australia": "#CBD5E8"})
@@ -27,7 +23,7 @@ def plot_figure_4(df):
 
     # Plotting
     fig, ax = plt.subplots(figsize=(6, 3))
-    ax.bar(X, df["Count (Data source)"], color=colors, edgecolor="black", linewidth=1, width=0.4,)
+    bars(ax, X, df["Count (Data source)"], colors)
     ax.set_xlabel('Data source', fontsize=font_size_label)
     ax.set_ylabel('Number of articles', fontsize=font_size_label)
     ax.set_xticks(X, df["Abbreviation (Data source)"], rotation=45, ha="right", fontsize=font_size_ticks)
@@ -37,16 +33,14 @@ def plot_figure_4(df):
     ax.grid(axis='x')
 
     # Legend with specified colors and no border
-    legend_elements = [
-        Patch(facecolor='#ADDBC7', label='United States', edgecolor="black", linewidth=1),
-        Patch(facecolor='#FDCDAC', label='United Kingdom', edgecolor="black", linewidth=1),
-        Patch(facecolor='#CBD5E8', label='Australia', edgecolor="black", linewidth=1)
-    ]
+    legend_elements = legend_patches({'United States': '#ADDBC7', 'United Kingdom': '#FDCDAC', 'Australia': '#CBD5E8'})
     plt.legend(handles=legend_elements, loc='lower center', bbox_to_anchor=(0.5, 1.0), ncol=3, fontsize=font_size_legend)
 
-    plt.savefig("figure_output/figure_4.svg", bbox_inches='tight')
-    plt.savefig("figure_output/figure_4.png", bbox_inches='tight')
-    plt.show()
+    export_figure(fig, "figure_4")
+    if show:
+        plt.show()
     plt.close()
 
-plot_figure_4(df)
+if __name__ == "__main__":
+    df = read_figure_data("data_figure_4")
+    plot_figure_4(df)
@@ -1,17 +1,19 @@
 import matplotlib.pyplot as plt
-import pandas as pd
-from pysankey2 import Sankey
+from figure_data import read_figure_data
+from figure_export import cached_render, export_figure
+from instrumentation import traced
+from sankey import plot_sankey, weighted_flows
 
 plt.rcParams['svg.fonttype'] = 'none'
 
-df = pd.read_excel("data_figures.xlsx", sheet_name="data_figure_5", engine="openpyxl")
+@traced("plot")
+@cached_render("figure_5", helpers=[plot_sankey])
+def plot_figure_5(df, show=True):
+    # Aggregate identical data source -> ICD-10 chapter pairs into weighted flows
+    flows = weighted_flows(df, "Abbreviation (Data source)", "Name (ICD-10 chapter)")
 
-def plot_figure_5(df):
-    # Remove columns not required and rename to "layer1" and "layer2"
-    df.rename(columns={"Abbreviation (Data source)":"layer1", "Name (ICD-10 chapter)": "layer2"}, inplace=True)
-
-    print(df["layer1"].unique())
-    print(df["layer2"].unique())
+    print(flows["layer1"].unique())
+    print(flows["layer2"].unique())
 
     # Assign colors
     cmap_p1 = plt.get_cmap("Pastel1")
@@ -50,19 +52,16 @@ def plot_figure_5(df):
                                'V) Mental and behavioural disorders']}
 
     # Plot sankey
-    sky = Sankey(df, layerLabels = layer_labels,  colorDict=color_dict, colorMode="layer", stripColor='left', )
-    fig, ax = sky.plot(figSize=(7, 4), fontSize=10, boxInterv=0.05, boxWidth=0.5, stripLen=8)
-
-    # Add label for "axes"
-    ax.text(0, 490, 'Data source', weight='bold', fontsize=10, ha="left", va="bottom")
-    ax.text(9, 490, 'ICD-10 chapter', weight='bold', fontsize=10, ha="right", va="bottom")
+    fig, ax = plot_sankey(flows, layer_labels, color_dict, layer_titles=("Data source", "ICD-10 chapter"),
+                          fig_size=(7, 4), font_size=10, box_interval=0.05, box_width=0.5, strip_len=8)
 
     # Plot and save
     fig.tight_layout()
-    plt.savefig("figure_output/figure_5.svg", bbox_inches='tight')
-    plt.savefig("figure_output/figure_5.png", bbox_inches='tight')
-    plt.show()
+    export_figure(fig, "figure_5")
+    if show:
+        plt.show()
     plt.close()
-    plt.show()
 
-plot_figure_5(df)
\ No newline at end of file
+if __name__ == "__main__":
+    df = read_figure_data("data_figure_5")
+    plot_figure_5(df)
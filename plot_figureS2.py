@@ -1,18 +1,17 @@
 import matplotlib as mpl
 import matplotlib.pyplot as plt
-import pandas as pd
+import numpy as np
 from tabulate import tabulate
+from bar_charts import apply_style, bar_labels, bars, legend_patches
+from figure_data import read_figure_data
+from figure_export import cached_render, export_figure
+from instrumentation import traced
 
-mpl.style.use("ggplot")
-COLOR = 'black'
-mpl.rcParams['text.color'] = COLOR
-mpl.rcParams['axes.labelcolor'] = COLOR
-mpl.rcParams['xtick.color'] = COLOR
-mpl.rcParams['ytick.color'] = COLOR
+apply_style()
 
-df = pd.read_excel("data_figures.xlsx", sheet_name="data_figure_S2", engine="openpyxl")
-
-def plot_figure_S2(df):
+@traced("plot")
+@cached_render("figure_S2", helpers=[bars])
+def plot_figure_S2(df, show=True):
 
     # Introduce line breaks for cleaner formatting
     df = df.rename(columns={'Distribution (ICD-10 chapter)': 'ICD-10\nchapter'})
@@ -33,23 +32,29 @@ def plot_figure_S2(df):
     colors= [colormap(i) for i in range(len(df.columns.tolist()))]
     colors[-1]= colormap(8)
 
-    # plot
-    ax = df.plot.barh(stacked=True, figsize=(10, 1), color=colors, edgecolor = "black", linewidth = 1)
+    # plot all chapters as one stacked bar
+    widths = df.iloc[0].to_numpy()
+    lefts = np.cumsum(widths) - widths
+    fig, ax = plt.subplots(figsize=(10, 1))
+    bars(ax, np.zeros(len(widths)), widths, colors, width=0.5, bottom=lefts, horizontal=True)
+    ax.set_yticks([0], df.index)
+    ax.set_ylim(-0.5, 0.5)
     ax.set_xlim([-2, 102])
     ax.set_xticks(range(0, 101, 10))
     ax.set_xlabel("Distribution [%]", size=10)
     ax.invert_yaxis()  # labels read top-to-bottom
 
     # annotations:
-    for c in ax.containers:
-        # format the number of decimal places and replace 0 with an empty string
-        labels_big = [f'{w:.1f}' if (w := v.get_width()) >= 3.5 else '' for v in c]
-        ax.bar_label(c, labels=labels_big, label_type='center')
-
-    plt.legend(loc='lower center', ncols = 2, bbox_to_anchor=(0.5, 1))
-    plt.savefig("figure_output/figure_S2.svg", bbox_inches='tight')
-    plt.savefig("figure_output/figure_S2.png", bbox_inches='tight')
-    plt.show()
+    # format the number of decimal places and replace 0 with an empty string
+    labels_big = [f'{w:.1f}' if w >= 3.5 else '' for w in widths]
+    bar_labels(ax, lefts + widths / 2, np.zeros(len(widths)), labels_big, ha='center', va='center')
+
+    plt.legend(handles=legend_patches(dict(zip(df.columns, colors))), loc='lower center', ncols = 2, bbox_to_anchor=(0.5, 1))
+    export_figure(fig, "figure_S2")
+    if show:
+        plt.show()
     plt.close()
 
-plot_figure_S2(df)
\ No newline at end of file
+if __name__ == "__main__":
+    df = read_figure_data("data_figure_S2")
+    plot_figure_S2(df)
@@ -0,0 +1,257 @@
+"""
+Local HTTP query service for figure data and statistics
+
+Serves the figure sheets and the statistics of data_statistics.py as
+JSON from one long-running process, so the charting results, the
+auxiliary tables and the libraries are loaded once (see
+data_session.py) instead of on every call of a script.
+
+    GET /figures                  names of the figure sheets
+    GET /figures/<sheet>          columns and rows of a figure sheet
+    GET /statistics               names of the statistics
+    GET /statistics/<name>        values of a statistic (counts, shares,
+                                  confidence intervals, test tables), the
+                                  query parameters n_resamples,
+                                  n_permutations, seed and workers are
+                                  passed on
+
+Every result is identified by a fingerprint of its inputs (modification
+time and size of the input files, the source code of the repository
+when the service started, the endpoint and the parameters),
+which is sent as ETag. Results are kept in an LRU cache keyed by the
+fingerprint. Requests with a matching If-None-Match header get a 304
+response without looking at the result. When an input file changes, the
+session is cleared and results are recomputed.
+"""
+import argparse
+import hashlib
+import inspect
+import json
+import math
+import os
+import threading
+import traceback
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+import pandas as pd
+from auxiliary_tables import AUXILIARY_TABLES, file_sha256
+from cli import STATISTICS
+from data_loading import CHARTING_FILE
+from data_session import get_session
+from figure_data import FIGURE_DATA_FILE
+from render_figures import FIGURES
+
+HOST = "127.0.0.1"
+PORT = 8050
+
+# Number of results kept in the LRU cache
+CACHE_SIZE = 128
+
+FIGURE_SHEETS = [sheet for _, _, sheet in FIGURES.values()]
+
+# Query parameters passed to the statistics (integers) with their minimum
+STATISTIC_PARAMETERS = {"n_resamples": 1, "n_permutations": 1, "seed": 0, "workers": 1}
+
+# Files the results depend on
+FIGURE_INPUT_FILES = [FIGURE_DATA_FILE]
+STATISTICS_INPUT_FILES = [CHARTING_FILE, FIGURE_DATA_FILE] + [file for file, _, _ in AUXILIARY_TABLES.values()]
+
+CODE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def code_fingerprint(directory=CODE_DIR):
+    """
+    Hash of all Python modules of the repository, the code
+    the results are computed with (modules are loaded once,
+    so the code only changes with a restart)
+    """
+    sha = hashlib.sha256()
+    for file in sorted(name for name in os.listdir(directory) if name.endswith(".py")):
+        sha.update(("%s:%s\n" % (file, file_sha256(os.path.join(directory, file)))).encode())
+    return sha.hexdigest()
+
+# Code of this process, part of every ETag
+CODE_FINGERPRINT = code_fingerprint()
+
+class ResultCache:
+    """
+    Thread-safe LRU cache of response bodies by fingerprint
+    """
+    def __init__(self, size=CACHE_SIZE):
+        self.size = size
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, compute):
+        """
+        Returns the cached result of key, computes and
+        caches it with compute() if it is not cached
+        """
+        with self._lock:
+            if key in self._results:
+                self._results.move_to_end(key)
+                return self._results[key]
+
+        result = compute()
+        with self._lock:
+            self._results[key] = result
+            while len(self._results) > self.size:
+                self._results.popitem(last=False)
+        return result
+
+class QueryService:
+    """
+    Resolves request paths to fingerprinted results of a data session
+    """
+    def __init__(self, session=None, cache_size=CACHE_SIZE):
+        self.session = session or get_session()
+        self.cache = ResultCache(cache_size)
+        self._input_fingerprint = None
+        self._session_lock = threading.Lock()
+
+    def resolve(self, parts, params):
+        """
+        Returns the ETag and a function computing the JSON body
+        of a request path (split into parts), raises KeyError for
+        unknown paths and ValueError for invalid parameters
+        """
+        self._refresh_session()
+
+        if parts == ["figures"]:
+            return _etag(FIGURE_INPUT_FILES, parts), lambda: _json({"figures": FIGURE_SHEETS})
+        if len(parts) == 2 and parts[0] == "figures" and parts[1] in FIGURE_SHEETS:
+            return _etag(FIGURE_INPUT_FILES, parts), lambda: self.figure(parts[1])
+        if parts == ["statistics"]:
+            return _etag([], parts), lambda: _json({"statistics": list(STATISTICS)})
+        if len(parts) == 2 and parts[0] == "statistics" and parts[1] in STATISTICS:
+            kwargs = _statistic_parameters(params)
+            return _etag(STATISTICS_INPUT_FILES, parts, kwargs), lambda: self.statistic(parts[1], kwargs)
+        raise KeyError("/".join(parts))
+
+    def figure(self, sheet_name):
+        df = self.session.figure_frame(sheet_name)
+        return _json({"sheet": sheet_name, **json.loads(df.to_json(orient="split", index=False))})
+
+    def statistic(self, name, kwargs):
+        import data_statistics
+
+        function = getattr(data_statistics, STATISTICS[name])
+        kwargs = {key: value for key, value in kwargs.items() if key in inspect.signature(function).parameters}
+        result = self.session.run(function, verbose=False, **kwargs)
+        return _json({"statistic": name, "parameters": kwargs, "result": _jsonable(result)})
+
+    def _refresh_session(self):
+        # Drop the loaded tables once any input file changed
+        fingerprint = _file_fingerprint(STATISTICS_INPUT_FILES)
+        with self._session_lock:
+            if self._input_fingerprint is not None and fingerprint != self._input_fingerprint:
+                self.session.clear()
+            self._input_fingerprint = fingerprint
+
+class QueryHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        service = self.server.service
+
+        try:
+            etag, compute = service.resolve(parts, params)
+        except KeyError:
+            return self._send_json(404, _json({"error": "Not found: %s" % url.path}))
+        except ValueError as error:
+            return self._send_json(400, _json({"error": str(error)}))
+
+        # Unchanged results are not looked up at all
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        try:
+            body = service.cache.get(etag, compute)
+        except Exception:
+            self.log_error("Failed to compute %s:\n%s", url.path, traceback.format_exc())
+            return self._send_json(500, _json({"error": "Internal error computing %s" % url.path}))
+
+        self._send_json(200, body, etag)
+
+    def _send_json(self, status, body, etag=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(body)
+
+def serve(host=HOST, port=PORT, session=None):
+    """
+    Serves the query service until interrupted
+    """
+    server = ThreadingHTTPServer((host, port), QueryHandler)
+    server.service = QueryService(session)
+    print("Serving on http://%s:%d" % (host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def _statistic_parameters(params):
+    # Integer query parameters of the statistics, raises ValueError for invalid values
+    kwargs = {}
+    for name, minimum in STATISTIC_PARAMETERS.items():
+        if name not in params:
+            continue
+        try:
+            kwargs[name] = int(params[name])
+        except ValueError:
+            raise ValueError("Parameter %s must be an integer: %s" % (name, params[name]))
+        if kwargs[name] < minimum:
+            raise ValueError("Parameter %s must be at least %d: %d" % (name, minimum, kwargs[name]))
+    return kwargs
+
+def _file_fingerprint(files):
+    # Modification time and size of the input files (missing files count as well)
+    stats = []
+    for file in files:
+        stat = os.stat(file) if os.path.exists(file) else None
+        stats.append([file, stat.st_mtime_ns if stat else None, stat.st_size if stat else None])
+    return stats
+
+def _etag(files, parts, params=None):
+    content = {"files": _file_fingerprint(files), "code": CODE_FINGERPRINT, "path": parts, "params": params or {}}
+    return '"%s"' % hashlib.sha256(json.dumps(content, sort_keys=True).encode()).hexdigest()[:32]
+
+def _jsonable(value):
+    # Tables as lists of records, numpy values as Python values, NaN as null
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient="records"))
+    if isinstance(value, pd.Series):
+        return _jsonable(value.to_dict())
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+def _json(payload):
+    return json.dumps(payload, default=str).encode()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local HTTP service for figure data and statistics")
+    parser.add_argument("--host", default=HOST, help="address to listen on")
+    parser.add_argument("--port", type=int, default=PORT, help="port to listen on")
+    args = parser.parse_args()
+
+    serve(args.host, args.port)
@@ -0,0 +1,78 @@
+import argparse
+import importlib
+import multiprocessing
+import time
+from concurrent.futures import FIRST_EXCEPTION, ProcessPoolExecutor, wait
+
+# Figures by name: (plot module, plot function, figure sheet)
+FIGURES = {
+    "figure_1": ("plot_figure1", "plot_figure_1", "data_figure_1"),
+    "figure_2": ("plot_figure2", "plot_figure_2", "data_figure_2"),
+    "figure_3a": ("plot_figure3", "plot_figure_3a", "data_figure_3a"),
+    "figure_3b": ("plot_figure3", "plot_figure_3b", "data_figure_3b"),
+    "figure_4": ("plot_figure4", "plot_figure_4", "data_figure_4"),
+    "figure_5": ("plot_figure5", "plot_figure_5", "data_figure_5"),
+    "figure_S2": ("plot_figureS2", "plot_figure_S2", "data_figure_S2"),
+}
+
+def render_figures(names=None, workers=None, shared_dir=None):
+    """
+    Renders the given figures (all by default) headless in a
+    process pool and returns per figure the render time in
+    seconds and whether it was rendered (False if the export
+    was up to date). Figures not yet started are cancelled as soon
+    as one figure fails to render. With shared_dir the workers
+    attach to the figure frames published there
+    """
+    names = list(FIGURES) if not names else list(names)
+    unknown = [name for name in names if name not in FIGURES]
+    if unknown:
+        raise ValueError("Unknown figures: %s (available: %s)" % (", ".join(unknown), ", ".join(FIGURES)))
+
+    # Every figure gets a fresh process since the plot modules set the
+    # global matplotlib style on import
+    context = multiprocessing.get_context("spawn")
+    executor = ProcessPoolExecutor(max_workers=workers or min(len(names), multiprocessing.cpu_count()),
+                                   mp_context=context, initializer=_init_worker, max_tasks_per_child=1)
+    futures = {executor.submit(render_figure, name, shared_dir): name for name in names}
+    try:
+        done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        for future in done:
+            if future.exception() is not None:
+                raise RuntimeError("Rendering %s failed" % futures[future]) from future.exception()
+        timings = {futures[future]: future.result() for future in futures}
+    finally:
+        # Figures not started yet are cancelled, running ones are awaited
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    return {name: timings[name] for name in names}
+
+def render_figure(name, shared_dir=None):
+    """
+    Renders a single figure without showing it and returns
+    the render time in seconds and whether it was rendered
+    """
+    from data_session import DataSession
+
+    start = time.perf_counter()
+    module_name, function_name, sheet_name = FIGURES[name]
+    plot_function = getattr(importlib.import_module(module_name), function_name)
+    rendered = plot_function(DataSession(shared_dir=shared_dir).figure_frame(sheet_name), show=False)
+    return time.perf_counter() - start, rendered
+
+def _init_worker():
+    import matplotlib
+    matplotlib.use("Agg")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Render figures to figure_output/ in parallel")
+    parser.add_argument("figures", nargs="*", help="figures to render (default: all of %s)" % ", ".join(FIGURES))
+    parser.add_argument("--workers", type=int, default=None, help="number of worker processes")
+    parser.add_argument("--shared", metavar="DIR", help="attach to the figure frames published in DIR (see shared_tables.py)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    timings = render_figures(args.figures, args.workers, args.shared)
+    for name, (seconds, rendered) in timings.items():
+        print("%s: %.2fs%s" % (name, seconds, "" if rendered else " (up to date)"))
+    print("Total: %.2fs" % (time.perf_counter() - start))
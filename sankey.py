@@ -0,0 +1,125 @@
+"""
+Two-layer Sankey diagrams of weighted flows
+
+The rows of a figure sheet (one row per article and data source or per
+author and data origin) are first aggregated into weighted flows, one
+per distinct (layer1, layer2) pair, so the layout only depends on the
+number of distinct flows. All strips are drawn as a single
+PolyCollection and all boxes as another one, instead of one patch per
+row. The layout follows pysankey2 (boxes stacked bottom-up in the given
+label order, box heights in rows, gaps of box_interval times the total
+weight, strips colored like their layer1 box).
+"""
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.collections import PolyCollection
+from instrumentation import traced
+
+LAYERS = ["layer1", "layer2"]
+
+# Points per strip edge
+STRIP_RESOLUTION = 50
+
+@traced("plot")
+def weighted_flows(df, layer1="layer1", layer2="layer2"):
+    """
+    Aggregates identical (layer1, layer2) rows into flows
+    with the number of rows as weight
+    """
+    flows = df.groupby([layer1, layer2], sort=False, observed=True).size().reset_index(name="weight")
+    return flows.rename(columns={layer1: "layer1", layer2: "layer2"})
+
+def sankey_layout(flows, layer_labels, box_interval=0.05, box_width=0.5, strip_len=7):
+    """
+    Positions of the boxes and the strips of weighted flows. Boxes
+    are returned as (layer, label, x, y, height), strips as flows
+    with the bottom y of the strip at the left and the right box
+    """
+    total = flows["weight"].sum()
+    gap = box_interval * total
+    x = {"layer1": 0, "layer2": box_width + strip_len}
+
+    boxes = []
+    ranks = {}
+    for layer in LAYERS:
+        # Labels missing in layer_labels are stacked above the given ones
+        weights = flows.groupby(layer, sort=False)["weight"].sum()
+        labels = list(layer_labels.get(layer, [])) + [label for label in weights.index if label not in layer_labels.get(layer, [])]
+        weights = weights.reindex(labels, fill_value=0)
+        y = np.concatenate([[0], np.cumsum(weights.to_numpy() + gap)[:-1]])
+        boxes.append(pd.DataFrame({"layer": layer, "label": labels, "x": x[layer], "y": y, "height": weights.to_numpy()}))
+        ranks[layer] = pd.Series(np.arange(len(labels)), index=labels)
+
+    boxes = pd.concat(boxes, ignore_index=True)
+    box_y = boxes.set_index(["layer", "label"])["y"]
+
+    # Strips leave a box in the order of the opposite layer, so they cross as little as possible
+    strips = flows.assign(rank1=flows["layer1"].map(ranks["layer1"]), rank2=flows["layer2"].map(ranks["layer2"]))
+    for layer, side, order in [("layer1", "y_left", ["rank1", "rank2"]), ("layer2", "y_right", ["rank2", "rank1"])]:
+        strips = strips.sort_values(order)
+        offset = strips.groupby(layer, sort=False)["weight"].cumsum() - strips["weight"]
+        strips[side] = box_y.loc[layer].reindex(strips[layer]).to_numpy() + offset
+    strips = strips.sort_index()
+
+    return boxes, strips.drop(columns=["rank1", "rank2"])
+
+def strip_polygons(strips, x_left, x_right, resolution=STRIP_RESOLUTION):
+    """
+    Vertices of all strips as array (strips, 2 * resolution, 2), each
+    strip is bounded by two smoothstep curves between the boxes
+    """
+    t = np.linspace(0, 1, resolution)
+    s = t * t * (3 - 2 * t)
+    x = x_left + (x_right - x_left) * t
+
+    y_left, y_right = strips["y_left"].to_numpy()[:, None], strips["y_right"].to_numpy()[:, None]
+    weight = strips["weight"].to_numpy()[:, None]
+    bottom = y_left + (y_right - y_left) * s
+    top = bottom + weight
+
+    xs = np.broadcast_to(np.concatenate([x, x[::-1]]), (len(strips.index), 2 * resolution))
+    ys = np.concatenate([bottom, top[:, ::-1]], axis=1)
+    return np.stack([xs, ys], axis=2)
+
+@traced("plot")
+def plot_sankey(df, layer_labels, color_dict, layer_titles=None, fig_size=(6, 4), font_size=10,
+                box_interval=0.05, box_width=0.5, strip_len=7, strip_alpha=0.4):
+    """
+    Plots a Sankey diagram of the rows of df (columns layer1 and
+    layer2, or weighted flows with a weight column) and returns
+    the figure and the axes. layer_titles are written above
+    the boxes of the two layers
+    """
+    flows = df if "weight" in df.columns else weighted_flows(df)
+    boxes, strips = sankey_layout(flows, layer_labels, box_interval, box_width, strip_len)
+    colors = {(layer, label): color for layer in LAYERS for label, color in color_dict.get(layer, {}).items()}
+    box_colors = [colors.get((layer, label), "lightgrey") for layer, label in zip(boxes["layer"], boxes["label"])]
+
+    fig, ax = plt.subplots(figsize=fig_size)
+
+    # All strips in one collection, colored like the left box
+    strip_colors = [colors.get(("layer1", label), "lightgrey") for label in strips["layer1"]]
+    ax.add_collection(PolyCollection(strip_polygons(strips, box_width, box_width + strip_len),
+                                     facecolors=strip_colors, edgecolors="none", alpha=strip_alpha))
+
+    # All boxes in one collection
+    x0, y0 = boxes["x"].to_numpy(), boxes["y"].to_numpy()
+    x1, y1 = x0 + box_width, y0 + boxes["height"].to_numpy()
+    box_vertices = np.stack([np.stack([x0, x1, x1, x0], axis=1), np.stack([y0, y0, y1, y1], axis=1)], axis=2)
+    ax.add_collection(PolyCollection(box_vertices, facecolors=box_colors, edgecolors="none"))
+
+    # Labels left of the boxes, outside for layer1 and over the strips for layer2
+    for label, x, y, height in boxes.loc[boxes["height"] > 0, ["label", "x", "y", "height"]].itertuples(index=False, name=None):
+        ax.text(x - 0.1, y + height / 2, label, ha="right", va="center", fontsize=font_size)
+
+    top = (y0 + boxes["height"].to_numpy()).max()
+    if layer_titles is not None:
+        ax.text(0, top * 1.03, layer_titles[0], weight="bold", fontsize=font_size, ha="left", va="bottom")
+        ax.text(2 * box_width + strip_len, top * 1.03, layer_titles[1], weight="bold", fontsize=font_size, ha="right", va="bottom")
+
+    ax.set_xlim(0, 2 * box_width + strip_len)
+    ax.set_ylim(0, top * 1.1)
+    ax.axis("off")
+
+    return fig, ax
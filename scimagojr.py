@@ -0,0 +1,81 @@
+"""
+Ingest of the yearly SCImago country rankings
+
+All yearly files in SCIMAGOJR_DIR are discovered by name and read
+into one long table (one row per country and year), the
+wide table with one column per indicator and year is built with a
+single pivot. Every yearly file is parsed once and then read from the
+columnar cache of auxiliary_tables.py, so adding the ranking of a new
+year only parses the new file.
+"""
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from auxiliary_tables import read_cached_workbook
+from instrumentation import traced
+
+SCIMAGOJR_DIR = "auxiliary_data/scimagojr"
+SCIMAGOJR_FILE_PATTERN = re.compile(r"^scimagojr country rank (\d{4})\.xlsx$")
+
+# Indicators of the rankings, one value per country and year
+SCIMAGOJR_INDICATORS = ["Documents", "Citable documents", "Citations", "Self-citations", "Citations per document", "H index"]
+
+def scimagojr_files(directory=SCIMAGOJR_DIR):
+    """
+    Returns the yearly ranking files found in directory
+    as year -> file, ordered by year
+    """
+    files = {}
+    for name in os.listdir(directory):
+        match = SCIMAGOJR_FILE_PATTERN.match(name)
+        if match:
+            files[match.group(1)] = os.path.join(directory, name)
+    return dict(sorted(files.items()))
+
+def read_scimagojr_year(year, file, indicators=SCIMAGOJR_INDICATORS):
+    """
+    Reads the ranking of a year as long table with
+    the columns Country, Year and the indicators
+    """
+    df = read_cached_workbook(f"scimagojr_{year}", file, "Sheet1")[["Country"] + list(indicators)]
+    return df.assign(Year=year)
+
+@traced("auxiliary")
+def load_scimagojr(years=None, indicators=SCIMAGOJR_INDICATORS, directory=SCIMAGOJR_DIR, workers=1):
+    """
+    Reads the rankings of the given years (default: all files
+    found) and returns them as one long table, with workers > 1
+    the files are read in a thread pool
+    """
+    files = scimagojr_files(directory)
+    years = list(files) if years is None else list(years)
+    missing = [year for year in years if year not in files]
+    if missing:
+        raise FileNotFoundError("No SCImago ranking for %s in %s" % (", ".join(missing), directory))
+
+    def read(year):
+        return read_scimagojr_year(year, files[year], indicators)
+
+    # openpyxl parses in Python, threads only overlap the file reads and rarely pay off
+    if workers > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            frames = list(executor.map(read, years))
+    else:
+        frames = [read(year) for year in years]
+
+    return pd.concat(frames, ignore_index=True)
+
+def scimagojr_wide(df_long):
+    """
+    Pivots the long table to one row per country and one
+    column "<indicator>_<year>" per indicator and year
+    """
+    indicators = [column for column in df_long.columns if column not in ("Country", "Year")]
+    df = df_long.pivot(index="Country", columns="Year", values=indicators)
+
+    # Rows ordered by country name like the outer merges of the yearly rankings
+    # that wrote the committed Citable_documents_per_country.xlsx
+    df = df.reindex(sorted(df_long["Country"].unique()))
+    df.columns = [f"{indicator}_{year}" for indicator, year in df.columns]
+    return df.reset_index()
@@ -0,0 +1,91 @@
+"""
+Tables shared with worker processes as memory-mapped Arrow IPC files
+
+The charting table, the article_source and article_origin link tables,
+the article features and the figure frames are published once as Arrow
+IPC files, by default in shared memory (/dev/shm). Workers attach to a
+table by name: the file is memory-mapped and the Arrow table references
+the mapped buffers without copying them, so all workers share one copy
+of the data instead of re-reading the workbook or the charting results
+or unpickling DataFrames. Converting to pandas keeps numeric columns
+as views of the mapping. Boolean columns (e.g. the article flags) are
+copied, as Arrow stores them as bitmaps and pandas as one byte per
+value, and categoricals and strings are materialized.
+Requires pyarrow.
+"""
+import os
+import shutil
+import tempfile
+from instrumentation import traced
+
+SHARED_DIR = os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "anonymization-review")
+
+# Names of the session tables published by publish_session()
+CHARTING_TABLES = ["charting", "article_source", "article_origin"]
+FEATURES_TABLE = "features"
+
+def shared_table_file(name, directory=SHARED_DIR):
+    return os.path.join(directory, f"{name}.arrow")
+
+def is_published(name, directory=SHARED_DIR):
+    return os.path.exists(shared_table_file(name, directory))
+
+@traced("shared")
+def publish_table(name, df, directory=SHARED_DIR):
+    """
+    Writes a DataFrame as Arrow IPC file, the file is replaced
+    atomically so attached workers never see a partial table
+    """
+    import pyarrow as pa
+
+    os.makedirs(directory, exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    file = shared_table_file(name, directory)
+    temporary = "%s.%d.tmp" % (file, os.getpid())
+    with pa.OSFile(temporary, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+        writer.write_table(table)
+    os.replace(temporary, file)
+    return file
+
+def attach_arrow(name, directory=SHARED_DIR):
+    """
+    Memory-maps a published table and returns it as Arrow table
+    without copying (the mapping lives as long as the table)
+    """
+    import pyarrow as pa
+
+    file = shared_table_file(name, directory)
+    if not os.path.exists(file):
+        raise FileNotFoundError("Table %s is not published in %s" % (name, directory))
+    return pa.ipc.open_file(pa.memory_map(file)).read_all()
+
+@traced("shared")
+def attach_table(name, directory=SHARED_DIR):
+    """
+    Memory-maps a published table and returns it as DataFrame,
+    dtypes (categoricals, small integers) are restored
+    """
+    return attach_arrow(name, directory).to_pandas(split_blocks=True)
+
+@traced("shared")
+def publish_session(session, sheets=None, features=True, directory=SHARED_DIR):
+    """
+    Publishes the charting tables, the article features and
+    the figure frames (default: all figure sheets) of a session
+    """
+    from render_figures import FIGURES
+
+    published = []
+    for name, df in zip(CHARTING_TABLES, session.charting):
+        published.append(publish_table(name, df, directory))
+    if features:
+        published.append(publish_table(FEATURES_TABLE, session.df_features, directory))
+    for sheet_name in sheets if sheets is not None else [sheet for _, _, sheet in FIGURES.values()]:
+        published.append(publish_table(sheet_name, session.figure_frame(sheet_name), directory))
+    return published
+
+def unpublish(directory=SHARED_DIR):
+    """
+    Removes all published tables
+    """
+    shutil.rmtree(directory, ignore_errors=True)
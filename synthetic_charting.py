@@ -0,0 +1,112 @@
+"""
+Synthetic charting results for benchmarks
+
+Generates charting CSVs with the schema of the charting results at a
+multiple of their size. Every field is drawn from its distribution in
+the real charting results, mixed with a small share of values drawn
+uniformly from the vocabularies of the auxiliary data (countries, data
+sources, ICD-10 chapters), so larger exports also contain values that
+are rare in the real data. Shares of domestic data use, of identical
+first and senior author and the number of data sources and data
+origins per article follow the real charting results.
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+from auxiliary_tables import load_auxiliary_table
+from data_loading import CHARTING_FILE
+
+SYNTHETIC_DIR = "benchmark_data"
+SCALES = [1, 10, 100, 1000]
+
+# Share of values drawn uniformly from the vocabularies instead of the real distribution
+VOCABULARY_SHARE = 0.02
+
+def synthetic_charting_file(scale, seed=0, output_dir=SYNTHETIC_DIR):
+    return os.path.join(output_dir, f"charting_results_x{scale}_seed{seed}.csv")
+
+def generate_charting(scale, seed=0, chart_file=CHARTING_FILE):
+    """
+    Returns a synthetic charting table with scale times the
+    number of rows of the charting results
+    """
+    rng = np.random.default_rng(seed)
+    df_real = pd.read_csv(chart_file, dtype=str, sep=";").fillna('')
+    df_included = df_real[df_real['Include'] == 'Yes']
+    rows = len(df_real.index) * scale
+
+    # Excluded articles keep the combination of the screening result and reason
+    df = df_real[['Include', 'Reason for exclusion']].iloc[rng.integers(0, len(df_real.index), rows)].reset_index(drop=True)
+    df.insert(0, 'PMID', np.arange(10000000, 10000000 + rows).astype(str))
+    df.insert(0, 'Title', ["Synthetic article %d" % number for number in range(rows)])
+    df['Publishing year'] = _sample(rng, df_real['Publishing year'], rows)
+    included = (df['Include'] == 'Yes').to_numpy()
+    count = included.sum()
+
+    # Vocabularies of the auxiliary data
+    countries = load_auxiliary_table("Country_information")["Country"]
+    sources = load_auxiliary_table("Data_source_information")["Data source"]
+    chapters = load_auxiliary_table("ICD-10_chapter_mapping")["ICD-10 chapter"]
+
+    first_author = _sample(rng, df_included['First author'], count, countries)
+    senior_author = _sample(rng, df_included['Senior author'], count, countries)
+    same_author = rng.random(count) < (df_included['First author'] == df_included['Senior author']).mean()
+    senior_author = np.where(same_author, first_author, senior_author)
+
+    # Data origins: domestic articles use data from the first author's country only
+    df_origins = df_included['Data origin'].str.replace(" ", "").str.split(",")
+    origin_counts = _sample(rng, df_origins.str.len(), count)
+    origins = _sample_lists(rng, df_origins.explode(), origin_counts, countries)
+    domestic = (origin_counts == 1) & (rng.random(count) < (df_included['Data origin'] == df_included['First author']).mean())
+    origins = [first if is_domestic else origin for first, origin, is_domestic in zip(first_author, origins, domestic)]
+
+    df_sources = df_included['Data source'].str.split(",").apply(lambda values: [value.lstrip() for value in values])
+    sources = _sample_lists(rng, df_sources.explode(), _sample(rng, df_sources.str.len(), count), sources)
+
+    fields = {
+        'ICD-10 chapter': _sample(rng, df_included['ICD-10 chapter'], count, chapters),
+        'COVID-19 research': _sample(rng, df_included['COVID-19 research'], count),
+        'First author': first_author,
+        'Senior author': senior_author,
+        'Data source': sources,
+        'Data origin': origins,
+    }
+    for column, values in fields.items():
+        df[column] = ''
+        df.loc[included, column] = values
+
+    return df[list(df_real.columns)]
+
+def write_charting(scale, seed=0, output_dir=SYNTHETIC_DIR):
+    """
+    Writes the synthetic charting results (if not generated
+    before with the same scale and seed) and returns the file name
+    """
+    file = synthetic_charting_file(scale, seed, output_dir)
+    if not os.path.exists(file):
+        os.makedirs(output_dir, exist_ok=True)
+        generate_charting(scale, seed).to_csv(file, sep=";", index=False)
+    return file
+
+def _sample(rng, values, size, vocabulary=None):
+    # Draws from the distribution of values, mixed with the vocabulary
+    sample = values.to_numpy()[rng.integers(0, len(values), size)]
+    if vocabulary is not None:
+        uniform = rng.random(size) < VOCABULARY_SHARE
+        sample[uniform] = vocabulary.to_numpy()[rng.integers(0, len(vocabulary), uniform.sum())]
+    return sample
+
+def _sample_lists(rng, values, lengths, vocabulary):
+    # Draws lists of the given lengths, joined as in the charting results
+    sample = _sample(rng, values, int(lengths.sum()), vocabulary)
+    return [", ".join(values) for values in np.split(sample, np.cumsum(lengths)[:-1])]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate synthetic charting results in %s/" % SYNTHETIC_DIR)
+    parser.add_argument("scales", nargs="*", type=int, default=SCALES, help="multiples of the size of the charting results")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for scale in args.scales:
+        print(write_charting(scale, args.seed))
@@ -0,0 +1,142 @@
+"""
+Threshold sweeps for the "other" bucketing of the figures
+
+Evaluates a whole grid of thresholds in one call instead of rerunning
+the preprocessing per threshold. The counts are sorted once, so the
+categories kept for a threshold are a prefix of the sorted counts and
+the "other" aggregates follow from cumulative sums. All sweeps work on
+the per-figure aggregates (see charting_aggregates.aggregate_charting)
+and use the same rules as data_preprocessing.py.
+"""
+import numpy as np
+import pandas as pd
+from tabulate import tabulate
+from auxiliary_tables import load_auxiliary_table
+from count_matrices import CountMatrix, flow_matrix_from_counts
+from data_session import get_session
+
+def sweep_thresholds(scores, thresholds, values=None, inclusive=True):
+    """
+    Keeps the categories whose score is at least (or, if not
+    inclusive, above) each threshold and sums up the values
+    of all other categories
+
+    Returns one row per threshold with the number of kept
+    categories, the kept categories (by descending score)
+    and the "other" sums of every column of values
+    """
+    order = np.argsort(-np.asarray(scores, dtype=float), kind="stable")
+    scores = scores.iloc[order]
+    values = (scores.to_frame("Count") if values is None else values.loc[scores.index]).astype(float)
+
+    # Sums of the first k categories for k = 0 ... n
+    prefix = np.vstack([np.zeros(values.shape[1]), np.cumsum(values.to_numpy(), axis=0)])
+    ascending = scores.to_numpy(dtype=float)[::-1]
+    kept = len(scores) - np.searchsorted(ascending, thresholds, side="left" if inclusive else "right")
+    other = prefix[-1] - prefix[kept]
+
+    df = pd.DataFrame({"Threshold": list(thresholds), "Count (kept)": kept,
+                       "Kept": [list(scores.index[:k]) for k in kept]})
+    for position, column in enumerate(values.columns):
+        df["Other (%s)" % column] = other[:, position]
+
+    return df
+
+def sweep_figure_2(aggregates, top_counts=range(5, 41, 5)):
+    """
+    Figure 2: countries outside the top-n countries by citable
+    documents (or without articles) are summarized as "other"
+    """
+    counts = aggregates["domestic_origin"].rename("Count (Data origin)")
+    df = load_auxiliary_table("Country_information", ["Country", "Name (Country)"])
+    df = pd.merge(df, load_auxiliary_table("Citable_documents_per_country", ["Name (Country)", "Citable documents_total"]), on='Name (Country)', how='outer')
+    df = df.dropna(subset=["Citable documents_total"]).drop_duplicates("Name (Country)").set_index("Name (Country)")
+    df["Count (Data origin)"] = df["Country"].map(counts)
+
+    # Citable documents of the top-n country, countries above it are kept
+    citable_document_values = np.sort(df["Citable documents_total"].unique())
+    thresholds = [citable_document_values[-n] for n in top_counts]
+
+    # Countries without articles are never kept
+    scores = df["Citable documents_total"].astype(float).where(df["Count (Data origin)"].notna(), -np.inf)
+    df_sweep = sweep_thresholds(scores, thresholds, df[["Count (Data origin)", "Citable documents_total"]].fillna(0), inclusive=False)
+    df_sweep.insert(0, "Top countries", list(top_counts))
+    return df_sweep
+
+def sweep_figure_3a(aggregates, thresholds=range(1, 31)):
+    """
+    Figure 3a: data origins with less than threshold
+    data flows are summarized as "other"
+    """
+    flows = flow_matrix_from_counts(aggregates["flows"])
+    values = pd.concat([flows.off_diagonal().column_counts().rename("Count (Data origin crossborder)"),
+                        flows.diagonal().column_counts().rename("Count (Data origin domestic)")], axis=1).fillna(0)
+    return sweep_thresholds(values.sum(axis=1), thresholds, values)
+
+def sweep_figure_3b(aggregates, thresholds=range(1, 11)):
+    """
+    Figure 3b: crossborder combinations of first author and
+    data origin with less than threshold flows are left out
+    """
+    pairs = flow_matrix_from_counts(aggregates["flows"]).off_diagonal().pairs()
+    return sweep_thresholds(pairs, thresholds, pairs.to_frame("Count (flows)"))
+
+def sweep_figure_S2(aggregates, thresholds=range(1, 21)):
+    """
+    Figure S2: ICD-10 chapters with a share below
+    threshold percent are summarized as "other"
+    """
+    counts = aggregates["icd"].astype(float)
+    values = pd.DataFrame({"Count (ICD-10 chapter)": counts, "Distribution (ICD-10 chapter)": counts * 100 / counts.sum()})
+    return sweep_thresholds(values["Distribution (ICD-10 chapter)"], thresholds, values)
+
+def sweep_figure_4(aggregates, thresholds=range(1, 21)):
+    """
+    Figure 4: data sources with less than threshold articles are left out
+    """
+    counts = aggregates["sources"]
+    return sweep_thresholds(counts, thresholds, counts.to_frame("Count (Data source)"))
+
+def sweep_figure_5(aggregates, thresholds_source=range(1, 11), thresholds_icd=range(5, 31, 5)):
+    """
+    Figure 5: data sources with less than threshold_source articles
+    are left out, ICD-10 chapters with less than threshold_icd
+    articles (of the remaining sources) are summarized as "other"
+    """
+    source_icd = CountMatrix.from_counts(aggregates["source_icd"])
+
+    # Sort the sources once, the chapter counts of the sources kept
+    # for every source threshold are cumulative sums over the rows
+    source_totals = np.asarray(source_icd.counts.sum(axis=1)).ravel()
+    order = np.argsort(-source_totals, kind="stable")
+    source_icd = source_icd.drop_columns([""])
+    chapter_counts = np.vstack([np.zeros(len(source_icd.columns)), np.cumsum(source_icd.counts[order].toarray(), axis=0)])
+    kept_sources = len(order) - np.searchsorted(source_totals[order][::-1], thresholds_source, side="left")
+
+    sweeps = []
+    for threshold_source, kept in zip(thresholds_source, kept_sources):
+        counts = pd.Series(chapter_counts[kept], index=source_icd.columns)
+        df_sweep = sweep_thresholds(counts[counts > 0], thresholds_icd, counts[counts > 0].to_frame("Count (ICD-10 chapter)"))
+        df_sweep.insert(0, "Threshold (Data source)", threshold_source)
+        df_sweep.insert(1, "Count (Data source)", kept)
+        sweeps.append(df_sweep.rename(columns={"Threshold": "Threshold (ICD-10 chapter)"}))
+
+    return pd.concat(sweeps, ignore_index=True)
+
+def sweep_all(aggregates):
+    """
+    Sweeps of all figures with their default threshold grids
+    """
+    return {
+        "figure_2": sweep_figure_2(aggregates),
+        "figure_3a": sweep_figure_3a(aggregates),
+        "figure_3b": sweep_figure_3b(aggregates),
+        "figure_S2": sweep_figure_S2(aggregates),
+        "figure_4": sweep_figure_4(aggregates),
+        "figure_5": sweep_figure_5(aggregates),
+    }
+
+if __name__ == "__main__":
+    for name, df_sweep in sweep_all(get_session().aggregates).items():
+        print(name)
+        print(tabulate(df_sweep.drop(columns="Kept"), headers='keys', tablefmt='psql', showindex=False))